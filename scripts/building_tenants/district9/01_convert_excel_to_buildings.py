@@ -6,25 +6,22 @@ then geocodes them to get coordinates.
 """
 
 import csv
-import os
 import sys
-import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
 
-import googlemaps
 import pandas as pd
 
+from utils.geocoding import geocode_many, get_api_key
+
 # Configuration
-PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 EXCEL_FILE = DATA_DIR / "district_9" / "9.xlsx"
 OUTPUT_CSV = DATA_DIR / "building_tenants" / "buildings" / "district9_buildings.csv"
 
-# Google Places API
-GOOGLE_PLACES_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
-gmaps = googlemaps.Client(key=GOOGLE_PLACES_API_KEY) if GOOGLE_PLACES_API_KEY else None
-
 
 def read_excel_file() -> pd.DataFrame:
     """Read the Excel file and extract building data"""
@@ -75,46 +72,26 @@ def extract_buildings(df: pd.DataFrame) -> List[Dict]:
     return buildings
 
 
-def geocode_address(address: str) -> Optional[tuple]:
-    """Geocode an address using Google Places API"""
-    if not gmaps:
-        return None
-
-    try:
-        time.sleep(0.1)  # Rate limiting
-        result = gmaps.geocode(address)
-        if result:
-            location = result[0]['geometry']['location']
-            return (location['lat'], location['lng'])
-    except Exception as e:
-        print(f"    Geocoding error for {address}: {e}")
-
-    return None
-
-
 def geocode_buildings(buildings: List[Dict]) -> List[Dict]:
-    """Geocode all building addresses"""
-    if not gmaps:
-        print("\n⚠️  GOOGLE_PLACES_API_KEY not set, skipping geocoding")
-        print("   Buildings will be saved without coordinates")
-        return buildings
+    """Geocode all building addresses (cached addresses cost no API call)"""
+    if not get_api_key():
+        print("\n⚠️  GOOGLE_PLACES_API_KEY not set, using cached coordinates only")
 
-    print(f"\nGeocoding {len(buildings)} addresses...")
+    pending = [b for b in buildings if not (b['latitude'] and b['longitude'])]
+    print(f"\nGeocoding {len(pending)} addresses...")
+    results = geocode_many(b['address'] for b in pending)
     geocoded = 0
 
-    for i, building in enumerate(buildings, 1):
+    for i, building in enumerate(pending, 1):
         address = building['address']
-        if building['latitude'] and building['longitude']:
-            continue  # Already has coordinates
-
-        print(f"  [{i}/{len(buildings)}] {address}")
-        coords = geocode_address(address)
+        print(f"  [{i}/{len(pending)}] {address}")
+        coords = results[address]
 
         if coords:
-            building['latitude'] = coords[0]
-            building['longitude'] = coords[1]
+            building['latitude'] = coords['latitude']
+            building['longitude'] = coords['longitude']
             geocoded += 1
-            print(f"    ✓ {coords[0]:.6f}, {coords[1]:.6f}")
+            print(f"    ✓ {coords['latitude']:.6f}, {coords['longitude']:.6f}")
         else:
             print(f"    ✗ Failed to geocode")
 
@@ -133,20 +110,10 @@ def save_buildings_csv(buildings: List[Dict]):
     ]
 
     with open(OUTPUT_CSV, 'w', encoding='utf-8', newline='') as f:
+        # extract_buildings() already populates every field
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
-
-        for building in buildings:
-            writer.writerow({
-                'address': building['address'],
-                'building_name': building.get('building_name', ''),
-                'estimated_tenants': building.get('estimated_tenants', 5),
-                'building_levels': building.get('building_levels', ''),
-                'building_type': building.get('building_type', 'office'),
-                'zip_code': building.get('zip_code', ''),
-                'latitude': building.get('latitude', ''),
-                'longitude': building.get('longitude', '')
-            })
+        writer.writerows(buildings)
 
     print(f"\n✓ Saved {len(buildings)} buildings to: {OUTPUT_CSV}")
 
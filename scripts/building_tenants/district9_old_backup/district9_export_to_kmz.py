@@ -4,56 +4,116 @@ Export District 9 Office Building Tenants to KMZ
 Creates interactive Google Maps KMZ file with building management info prominently displayed
 """
 
-import csv
+import io
 import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+from typing import Dict, List, Optional, Set
+from xml.etree.ElementTree import Element, SubElement, tostring
 import zipfile
 from datetime import datetime
 
+import pandas as pd
+
 
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "data" / "building_tenants"
 DISTRICT9_DATA_DIR = DATA_DIR / "tenants" / "district9"
 BUILDINGS_CSV = DATA_DIR / "buildings" / "district9_buildings.csv"
-OUTPUT_KML = DATA_DIR / "exports" / "district9_tenants.kml"
 OUTPUT_KMZ = DATA_DIR / "exports" / "district9_tenants.kmz"
 
+# KML document wrapper; placemarks are streamed between these one at a time
+KML_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n<kml xmlns=\"http://www.opengis.net/kml/2.2\"><Document>"
+KML_FOOTER = "</Document></kml>"
+
+# Marker style IDs (see determine_marker_style) and their icons
+MARKER_STYLES = (
+    ("high-density", "http://maps.google.com/mapfiles/kml/paddle/grn-circle.png"),
+    ("medium-density", "http://maps.google.com/mapfiles/kml/paddle/ylw-circle.png"),
+    ("low-density", "http://maps.google.com/mapfiles/kml/paddle/orange-circle.png"),
+    ("minimal-data", "http://maps.google.com/mapfiles/kml/paddle/wht-circle.png"),
+)
+
+# Threads used to read tenant CSVs (I/O bound) ahead of placemark creation
+TENANT_LOAD_WORKERS = 8
+
 
 def load_building_data() -> List[Dict]:
     """Load all District 9 building coordinates from CSV"""
-    buildings = []
-    with open(BUILDINGS_CSV, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            buildings.append({
-                'name': row['building_name'],
-                'address': row['address'],
-                'lat': float(row['latitude']),
-                'lon': float(row['longitude'])
-            })
-    return buildings
-
-
-def load_tenant_data(building_name: str) -> Dict:
+    # Coordinates are parsed straight into float64 columns by pyarrow. Only
+    # blank cells count as missing, so text such as a 'nan' building name
+    # stays a string, and blank names/addresses become '' as with csv.DictReader
+    buildings_df = pd.read_csv(
+        BUILDINGS_CSV,
+        engine='pyarrow',
+        usecols=['building_name', 'address', 'latitude', 'longitude'],
+        dtype={'building_name': str, 'address': str, 'latitude': 'float64', 'longitude': 'float64'},
+        keep_default_na=False,
+        na_values=['']
+    )
+    buildings_df[['building_name', 'address']] = buildings_df[['building_name', 'address']].fillna('')
+
+    # Skip buildings that were never geocoded (blank coordinates)
+    missing = buildings_df['latitude'].isna() | buildings_df['longitude'].isna()
+    if missing.any():
+        print(f"   ⚠ Skipping {int(missing.sum())} buildings without coordinates")
+        buildings_df = buildings_df[~missing]
+
+    buildings_df = buildings_df.rename(columns={
+        'building_name': 'name',
+        'latitude': 'lat',
+        'longitude': 'lon'
+    })
+    return buildings_df[['name', 'address', 'lat', 'lon']].to_dict('records')
+
+
+def read_tenant_csv(path: Path) -> List[Dict]:
+    """Read a tenant CSV into row dicts, keeping every value as a string ('' when empty)"""
+    return pd.read_csv(path, engine='pyarrow', dtype=str, keep_default_na=False).to_dict('records')
+
+
+# Mapping of building names to their actual CSV filename prefixes
+TENANT_FILENAME_MAP = {
+    '330 Madison Avenue': '330Madison',
+    '1221 Avenue of the Americas': '1221_6th',
+    '477 Madison Avenue': '477 Madison Ave',
+    '485 Madison Avenue': '485_Madison_Ave',
+    '488 Madison Avenue': '488_Madison_Ave',
+    '499 Park Avenue': '499 Park Ave'
+}
+
+# Columns whose values repeat across many rows (firm names, titles, types);
+# interned at load time so duplicates share one string object
+INTERNED_FIELDS = {
+    'merchants': ('contact_title',),
+    'lawyers': ('company_name', 'lawyer_title'),
+    'building_contacts': ('building_type', 'management_company', 'contact_title'),
+}
+
+
+def scan_tenant_files() -> Set[str]:
+    """List the tenant CSV filenames present in the District 9 data directory"""
+    if not DISTRICT9_DATA_DIR.is_dir():
+        return set()
+    return {p.name for p in DISTRICT9_DATA_DIR.iterdir()}
+
+
+def load_tenant_data(building_name: str, present_files: Optional[Set[str]] = None) -> Dict:
     """
     Load all tenant data for a building from District 9 CSV files
     Returns dict with merchants, lawyers, building_contacts
+
+    present_files: filenames from scan_tenant_files(); pass it when loading
+    many buildings so the directory is only listed once
     """
-    # Mapping of building names to their actual CSV filename prefixes
-    filename_map = {
-        '330 Madison Avenue': '330Madison',
-        '1221 Avenue of the Americas': '1221_6th',
-        '477 Madison Avenue': '477 Madison Ave',
-        '485 Madison Avenue': '485_Madison_Ave',
-        '488 Madison Avenue': '488_Madison_Ave',
-        '499 Park Avenue': '499 Park Ave'
-    }
+    if present_files is None:
+        present_files = scan_tenant_files()
 
     # Get the filename prefix for this building
-    filename_prefix = filename_map.get(building_name)
+    filename_prefix = TENANT_FILENAME_MAP.get(building_name)
 
     result = {
         'merchants': [],
@@ -64,43 +124,26 @@ def load_tenant_data(building_name: str) -> Dict:
     if not filename_prefix:
         return result
 
-    # Try to load merchants
-    merchants_file = DISTRICT9_DATA_DIR / f"{filename_prefix}_merchants.csv"
-    if merchants_file.exists():
-        with open(merchants_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            result['merchants'] = list(reader)
-
-    # Try to load lawyers
-    lawyers_file = DISTRICT9_DATA_DIR / f"{filename_prefix}_lawyers.csv"
-    if lawyers_file.exists():
-        with open(lawyers_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            result['lawyers'] = list(reader)
-
-    # Try to load building contacts
-    contacts_file = DISTRICT9_DATA_DIR / f"{filename_prefix}_building_contacts.csv"
-    if contacts_file.exists():
-        with open(contacts_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            result['building_contacts'] = list(reader)
+    for key in ('merchants', 'lawyers', 'building_contacts'):
+        filename = f"{filename_prefix}_{key}.csv"
+        if filename in present_files:
+            rows = read_tenant_csv(DISTRICT9_DATA_DIR / filename)
+            for row in rows:
+                for field in INTERNED_FIELDS[key]:
+                    value = row.get(field)
+                    if value:
+                        row[field] = sys.intern(value)
+            result[key] = rows
 
     return result
 
 
-def create_html_popup(building: Dict, tenants: Dict) -> str:
-    """Generate HTML popup content for a building with building management prominently displayed"""
-    name = building['name']
-    address = building['address']
-
-    # Count totals
-    total_merchants = len(tenants['merchants'])
-    total_lawyers = len(tenants['lawyers'])
-    total_contacts = len(tenants['building_contacts'])
-    total_tenants = total_merchants + total_lawyers
-
-    # Start HTML with building header
-    html = f'''<div style="font-family: Arial, sans-serif; max-width: 600px; font-size: 13px;">
+# ===========================
+# POPUP HTML TEMPLATES
+# ===========================
+# Static fragments are built once at import; create_html_popup only fills in
+# the non-empty fields of each tenant/contact.
+POPUP_HEADER = '''<div style="font-family: Arial, sans-serif; max-width: 600px; font-size: 13px;">
   <h2 style="color: #1a73e8; margin: 0 0 8px 0; font-size: 18px;">
     🏢 {name}
   </h2>
@@ -109,174 +152,193 @@ def create_html_popup(building: Dict, tenants: Dict) -> str:
   </p>
 '''
 
-    # ===========================
-    # BUILDING MANAGEMENT SECTION - PROMINENTLY DISPLAYED FIRST
-    # ===========================
-    if total_contacts > 0:
-        html += f'''
+MANAGEMENT_SECTION_OPEN = '''
   <div style="background: linear-gradient(135deg, #fff9e6 0%, #fff3cd 100%); border: 2px solid #f9a825; border-radius: 8px; padding: 15px; margin-bottom: 20px; box-shadow: 0 2px 8px rgba(249,168,37,0.2);">
     <h3 style="color: #d68000; margin: 0 0 12px 0; font-size: 17px; border-bottom: 2px solid #f9a825; padding-bottom: 8px;">
       🏗️ BUILDING MANAGEMENT
     </h3>
 '''
-        for contact in tenants['building_contacts']:
-            building_name_field = contact.get('building_name', '')
-            building_type = contact.get('building_type', '')
-            mgmt_company = contact.get('management_company', '')
-            contact_name = contact.get('contact_name', '')
-            contact_title = contact.get('contact_title', '')
-            contact_email = contact.get('contact_email', '')
-            contact_phone = contact.get('contact_phone', '')
-            tenant_email = contact.get('tenant_engagement_email', '')
-            main_phone = contact.get('main_phone', '')
-            website = contact.get('website', '')
-            portal = contact.get('tenant_portal', '')
-
-            # Management company section
-            if mgmt_company:
-                html += f'    <p style="margin: 5px 0; font-size: 15px; font-weight: bold; color: #d68000;">🏢 {mgmt_company}</p>\n'
-
-            if building_type:
-                html += f'    <p style="margin: 3px 0; font-size: 13px; color: #555;">Type: {building_type}</p>\n'
-
-            # Primary contact
-            if contact_name:
-                title_str = f" - {contact_title}" if contact_title else ""
-                html += f'    <p style="margin: 8px 0 3px 0; font-size: 14px; font-weight: bold; color: #333;">👤 {contact_name}{title_str}</p>\n'
-
-            # Contact information
-            if contact_email:
-                html += f'    <p style="margin: 3px 0; font-size: 13px;">📧 <a href="mailto:{contact_email}" style="color: #1a73e8; text-decoration: none;">{contact_email}</a></p>\n'
-            if contact_phone:
-                html += f'    <p style="margin: 3px 0; font-size: 13px;">📞 {contact_phone}</p>\n'
-
-            # Additional contact info
-            if tenant_email and tenant_email != contact_email:
-                html += f'    <p style="margin: 3px 0; font-size: 12px; color: #555;">📬 Tenant Engagement: <a href="mailto:{tenant_email}" style="color: #1a73e8;">{tenant_email}</a></p>\n'
-            if main_phone and main_phone != contact_phone:
-                html += f'    <p style="margin: 3px 0; font-size: 12px; color: #555;">☎️ Main Phone: {main_phone}</p>\n'
-
-            # Links
-            if website:
-                html += f'    <p style="margin: 5px 0 3px 0; font-size: 13px;">🌐 <a href="{website}" target="_blank" style="color: #1a73e8; font-weight: 500;">Building Website</a></p>\n'
-            if portal:
-                html += f'    <p style="margin: 3px 0; font-size: 13px;">🔐 <a href="{portal}" target="_blank" style="color: #1a73e8; font-weight: 500;">Tenant Portal</a></p>\n'
-
-        html += '  </div>\n'
-
-    # Add separator and tenant summary
-    html += f'''
+
+# (field, template) pairs rendered in order for each building contact
+CONTACT_TEMPLATES = (
+    ('management_company', '    <p style="margin: 5px 0; font-size: 15px; font-weight: bold; color: #d68000;">🏢 {}</p>\n'),
+    ('building_type', '    <p style="margin: 3px 0; font-size: 13px; color: #555;">Type: {}</p>\n'),
+    ('contact_line', '    <p style="margin: 8px 0 3px 0; font-size: 14px; font-weight: bold; color: #333;">👤 {}</p>\n'),
+    ('contact_email', '    <p style="margin: 3px 0; font-size: 13px;">📧 <a href="mailto:{0}" style="color: #1a73e8; text-decoration: none;">{0}</a></p>\n'),
+    ('contact_phone', '    <p style="margin: 3px 0; font-size: 13px;">📞 {}</p>\n'),
+    ('tenant_engagement_email', '    <p style="margin: 3px 0; font-size: 12px; color: #555;">📬 Tenant Engagement: <a href="mailto:{0}" style="color: #1a73e8;">{0}</a></p>\n'),
+    ('main_phone', '    <p style="margin: 3px 0; font-size: 12px; color: #555;">☎️ Main Phone: {}</p>\n'),
+    ('website', '    <p style="margin: 5px 0 3px 0; font-size: 13px;">🌐 <a href="{}" target="_blank" style="color: #1a73e8; font-weight: 500;">Building Website</a></p>\n'),
+    ('tenant_portal', '    <p style="margin: 3px 0; font-size: 13px;">🔐 <a href="{}" target="_blank" style="color: #1a73e8; font-weight: 500;">Tenant Portal</a></p>\n'),
+)
+
+TENANT_SUMMARY = '''
   <hr style="border: 1px solid #ddd; margin: 15px 0;"/>
   <p style="margin: 10px 0; font-size: 14px; color: #333;"><b>Total Tenants:</b> {total_tenants}</p>
 '''
 
-    # ===========================
-    # MERCHANTS SECTION
-    # ===========================
-    if total_merchants > 0:
-        html += f'''
+MERCHANTS_SECTION_OPEN = '''
   <h4 style="color: #333; border-bottom: 2px solid #1a73e8; padding-bottom: 5px; margin-top: 15px; font-size: 14px;">
     📋 Tenants ({total_merchants})
   </h4>
   <div style="margin-left: 10px;">
 '''
-        for merchant in tenants['merchants'][:20]:  # Limit to 20
-            name = merchant.get('name', 'Unknown')
-            website = merchant.get('website', '')
-            email = merchant.get('email', '')
-            phone = merchant.get('phone', '')
-            contact_person = merchant.get('contact_person', '')
-            contact_title = merchant.get('contact_title', '')
-
-            html += f'''
+
+MERCHANT_OPEN = '''
     <div style="margin-bottom: 12px; padding: 8px; background: #f8f9fa; border-radius: 4px;">
-      <p style="margin: 2px 0; font-weight: bold;">{name}</p>
+      <p style="margin: 2px 0; font-weight: bold;">{}</p>
 '''
-            if website:
-                html += f'      <p style="margin: 2px 0; font-size: 12px;">🌐 <a href="{website}" target="_blank">Website</a></p>\n'
-            if email:
-                html += f'      <p style="margin: 2px 0; font-size: 12px;">📧 {email}</p>\n'
-            if phone:
-                html += f'      <p style="margin: 2px 0; font-size: 12px;">📞 {phone}</p>\n'
-            if contact_person:
-                title_str = f" - {contact_title}" if contact_title else ""
-                html += f'      <p style="margin: 2px 0; font-size: 11px; color: #666;">👤 {contact_person}{title_str}</p>\n'
-
-            html += '    </div>\n'
 
-        if total_merchants > 20:
-            html += f'    <p style="color: #666; font-style: italic; font-size: 12px;">...and {total_merchants - 20} more tenants</p>\n'
+# (field, template) pairs rendered in order for each merchant
+MERCHANT_TEMPLATES = (
+    ('website', '      <p style="margin: 2px 0; font-size: 12px;">🌐 <a href="{}" target="_blank">Website</a></p>\n'),
+    ('email', '      <p style="margin: 2px 0; font-size: 12px;">📧 {}</p>\n'),
+    ('phone', '      <p style="margin: 2px 0; font-size: 12px;">📞 {}</p>\n'),
+    ('contact_line', '      <p style="margin: 2px 0; font-size: 11px; color: #666;">👤 {}</p>\n'),
+)
 
-        html += '  </div>\n'
+MERCHANTS_MORE = '    <p style="color: #666; font-style: italic; font-size: 12px;">...and {} more tenants</p>\n'
 
-    # ===========================
-    # LAW FIRMS SECTION
-    # ===========================
-    if total_lawyers > 0:
-        html += f'''
+LAW_FIRMS_SECTION_OPEN = '''
   <h4 style="color: #333; border-bottom: 2px solid #d32f2f; padding-bottom: 5px; margin-top: 15px; font-size: 14px;">
     ⚖️ Law Firms ({total_lawyers})
   </h4>
   <div style="margin-left: 10px;">
 '''
+
+LAW_FIRM_OPEN = (
+    '    <div style="margin-bottom: 10px;">\n'
+    '      <p style="margin: 2px 0; font-weight: bold;">{}</p>\n'
+    '      <ul style="margin: 5px 0; padding-left: 20px; font-size: 12px;">\n'
+)
+LAW_FIRM_CLOSE = '      </ul>\n    </div>\n'
+ATTORNEYS_MORE = '        <li style="color: #666; font-style: italic;">...and {} more attorneys</li>\n'
+LAW_FIRMS_MORE = '    <p style="color: #666; font-style: italic; font-size: 12px;">...and {} more law firms</p>\n'
+
+NO_DATA_MESSAGE = '''
+  <p style="color: #999; font-style: italic; margin-top: 15px;">
+    No data available for this building.
+  </p>
+'''
+
+POPUP_FOOTER = '''
+  <hr style="border: 1px solid #ddd; margin-top: 15px;"/>
+  <p style="font-size: 11px; color: #999; text-align: center; margin: 5px 0;">
+    District 9 Buildings - Data scraped: {today_str}
+  </p>
+</div>'''
+
+
+def _person_line(person: str, title: str) -> str:
+    """Format "Name - Title" (title optional); empty when there is no name"""
+    if not person:
+        return ''
+    return f"{person} - {title}" if title else person
+
+
+def _render_fields(parts: List[str], fields: Dict, templates: tuple) -> None:
+    """Append the template for every non-empty field, in template order"""
+    for field, template in templates:
+        value = fields.get(field)
+        if value:
+            parts.append(template.format(value))
+
+
+def create_html_popup(building: Dict, tenants: Dict, today_str: Optional[str] = None) -> str:
+    """
+    Generate HTML popup content for a building with building management prominently displayed
+
+    today_str: scrape date shown in the footer; computed once per export by the caller
+    """
+    if today_str is None:
+        today_str = datetime.now().strftime('%Y-%m-%d')
+
+    # Count totals
+    total_merchants = len(tenants['merchants'])
+    total_lawyers = len(tenants['lawyers'])
+    total_contacts = len(tenants['building_contacts'])
+    total_tenants = total_merchants + total_lawyers
+
+    # Start HTML with building header; fragments are joined once at the end
+    parts = [POPUP_HEADER.format(name=building['name'], address=building['address'])]
+
+    # Building management section - prominently displayed first
+    if total_contacts > 0:
+        parts.append(MANAGEMENT_SECTION_OPEN)
+        for contact in tenants['building_contacts']:
+            fields = dict(contact)
+            fields['contact_line'] = _person_line(contact.get('contact_name', ''), contact.get('contact_title', ''))
+            # Only show secondary email/phone when they differ from the primary ones
+            if fields.get('tenant_engagement_email') == contact.get('contact_email'):
+                fields['tenant_engagement_email'] = ''
+            if fields.get('main_phone') == contact.get('contact_phone'):
+                fields['main_phone'] = ''
+            _render_fields(parts, fields, CONTACT_TEMPLATES)
+        parts.append('  </div>\n')
+
+    # Separator and tenant summary
+    parts.append(TENANT_SUMMARY.format(total_tenants=total_tenants))
+
+    # Merchants section
+    if total_merchants > 0:
+        parts.append(MERCHANTS_SECTION_OPEN.format(total_merchants=total_merchants))
+        for merchant in tenants['merchants'][:20]:  # Limit to 20
+            fields = dict(merchant)
+            fields['contact_line'] = _person_line(merchant.get('contact_person', ''), merchant.get('contact_title', ''))
+            parts.append(MERCHANT_OPEN.format(merchant.get('name', 'Unknown')))
+            _render_fields(parts, fields, MERCHANT_TEMPLATES)
+            parts.append('    </div>\n')
+
+        if total_merchants > 20:
+            parts.append(MERCHANTS_MORE.format(total_merchants - 20))
+
+        parts.append('  </div>\n')
+
+    # Law firms section
+    if total_lawyers > 0:
+        parts.append(LAW_FIRMS_SECTION_OPEN.format(total_lawyers=total_lawyers))
+
         # Group by company
-        lawyers_by_company = {}
+        lawyers_by_company = defaultdict(list)
         for lawyer in tenants['lawyers']:
-            company = lawyer.get('company_name', 'Unknown Firm')
-            if company not in lawyers_by_company:
-                lawyers_by_company[company] = []
-            lawyers_by_company[company].append(lawyer)
+            lawyers_by_company[lawyer.get('company_name', 'Unknown Firm')].append(lawyer)
 
         for company, lawyers in list(lawyers_by_company.items())[:10]:  # Limit to 10 firms
-            html += f'    <div style="margin-bottom: 10px;">\n'
-            html += f'      <p style="margin: 2px 0; font-weight: bold;">{company}</p>\n'
-            html += '      <ul style="margin: 5px 0; padding-left: 20px; font-size: 12px;">\n'
+            parts.append(LAW_FIRM_OPEN.format(company))
 
             for lawyer in lawyers[:5]:  # Max 5 lawyers per firm
-                lawyer_name = lawyer.get('lawyer_name', '')
-                lawyer_title = lawyer.get('lawyer_title', '')
+                lawyer_line = _person_line(lawyer.get('lawyer_name', ''), lawyer.get('lawyer_title', ''))
+                if not lawyer_line:
+                    continue
                 lawyer_email = lawyer.get('lawyer_email', '')
                 lawyer_phone = lawyer.get('lawyer_phone', '')
 
-                if lawyer_name:
-                    title_str = f" - {lawyer_title}" if lawyer_title else ""
-                    html += f'        <li>{lawyer_name}{title_str}'
-                    if lawyer_email or lawyer_phone:
-                        html += '<br/>'
-                        if lawyer_email:
-                            html += f'📧 {lawyer_email} '
-                        if lawyer_phone:
-                            html += f'📞 {lawyer_phone}'
-                    html += '</li>\n'
+                parts.append(f'        <li>{lawyer_line}')
+                if lawyer_email or lawyer_phone:
+                    parts.append('<br/>')
+                    if lawyer_email:
+                        parts.append(f'📧 {lawyer_email} ')
+                    if lawyer_phone:
+                        parts.append(f'📞 {lawyer_phone}')
+                parts.append('</li>\n')
 
             if len(lawyers) > 5:
-                html += f'        <li style="color: #666; font-style: italic;">...and {len(lawyers) - 5} more attorneys</li>\n'
+                parts.append(ATTORNEYS_MORE.format(len(lawyers) - 5))
 
-            html += '      </ul>\n'
-            html += '    </div>\n'
+            parts.append(LAW_FIRM_CLOSE)
 
         if len(lawyers_by_company) > 10:
-            html += f'    <p style="color: #666; font-style: italic; font-size: 12px;">...and {len(lawyers_by_company) - 10} more law firms</p>\n'
+            parts.append(LAW_FIRMS_MORE.format(len(lawyers_by_company) - 10))
 
-        html += '  </div>\n'
+        parts.append('  </div>\n')
 
     # No data message
     if total_tenants == 0 and total_contacts == 0:
-        html += '''
-  <p style="color: #999; font-style: italic; margin-top: 15px;">
-    No data available for this building.
-  </p>
-'''
+        parts.append(NO_DATA_MESSAGE)
 
-    # Footer
-    html += f'''
-  <hr style="border: 1px solid #ddd; margin-top: 15px;"/>
-  <p style="font-size: 11px; color: #999; text-align: center; margin: 5px 0;">
-    District 9 Buildings - Data scraped: {datetime.now().strftime('%Y-%m-%d')}
-  </p>
-</div>'''
+    parts.append(POPUP_FOOTER.format(today_str=today_str))
 
-    return html
+    return ''.join(parts)
 
 
 def determine_marker_style(tenant_count: int) -> str:
@@ -293,14 +355,7 @@ def determine_marker_style(tenant_count: int) -> str:
 
 def create_kml_styles(doc: Element) -> None:
     """Create color-coded marker styles"""
-    styles = [
-        ("high-density", "http://maps.google.com/mapfiles/kml/paddle/grn-circle.png"),
-        ("medium-density", "http://maps.google.com/mapfiles/kml/paddle/ylw-circle.png"),
-        ("low-density", "http://maps.google.com/mapfiles/kml/paddle/orange-circle.png"),
-        ("minimal-data", "http://maps.google.com/mapfiles/kml/paddle/wht-circle.png"),
-    ]
-
-    for style_id, icon_url in styles:
+    for style_id, icon_url in MARKER_STYLES:
         style = SubElement(doc, "Style", id=style_id)
         icon_style = SubElement(style, "IconStyle")
         icon = SubElement(icon_style, "Icon")
@@ -308,8 +363,8 @@ def create_kml_styles(doc: Element) -> None:
         href.text = icon_url
 
 
-def create_building_placemark(doc: Element, building: Dict, tenants: Dict) -> None:
-    """Create KML placemark for a building"""
+def create_building_placemark(building: Dict, tenants: Dict, today_str: Optional[str] = None) -> Element:
+    """Create a standalone KML placemark element for a building"""
     name = building['name']
     lat = building['lat']
     lon = building['lon']
@@ -318,7 +373,7 @@ def create_building_placemark(doc: Element, building: Dict, tenants: Dict) -> No
     tenant_count = len(tenants['merchants']) + len(tenants['lawyers'])
 
     # Create placemark
-    placemark = SubElement(doc, "Placemark")
+    placemark = Element("Placemark")
 
     # Name
     name_elem = SubElement(placemark, "name")
@@ -326,7 +381,7 @@ def create_building_placemark(doc: Element, building: Dict, tenants: Dict) -> No
 
     # Description (HTML popup)
     description = SubElement(placemark, "description")
-    html_content = create_html_popup(building, tenants)
+    html_content = create_html_popup(building, tenants, today_str)
     description.text = f"<![CDATA[{html_content}]]>"
 
     # Style
@@ -338,6 +393,8 @@ def create_building_placemark(doc: Element, building: Dict, tenants: Dict) -> No
     coordinates = SubElement(point, "coordinates")
     coordinates.text = f"{lon},{lat},0"
 
+    return placemark
+
 
 def export_to_kmz() -> None:
     """Main export function"""
@@ -350,58 +407,65 @@ def export_to_kmz() -> None:
     buildings = load_building_data()
     print(f"   Loaded {len(buildings)} buildings")
 
-    # Create KML document
-    print("\n2. Creating KML document...")
-    kml = Element("kml", xmlns="http://www.opengis.net/kml/2.2")
-    document = SubElement(kml, "Document")
+    today_str = datetime.now().strftime('%Y-%m-%d')
+
+    # Document header (name, description, styles)
+    print("\n2. Writing KML document...")
+    header = Element("Document")
 
     # Document info
-    doc_name = SubElement(document, "name")
+    doc_name = SubElement(header, "name")
     doc_name.text = "District 9 Office Building Tenants"
 
-    doc_desc = SubElement(document, "description")
-    doc_desc.text = f"District 9 buildings with tenant directories and building management - Scraped {datetime.now().strftime('%Y-%m-%d')}"
+    doc_desc = SubElement(header, "description")
+    doc_desc.text = f"District 9 buildings with tenant directories and building management - Scraped {today_str}"
 
     # Create styles
     print("   Creating marker styles...")
-    create_kml_styles(document)
+    create_kml_styles(header)
 
-    # Create placemarks
+    # Create placemarks, writing each one out as soon as it is built
     print("\n3. Creating placemarks for buildings...")
     buildings_with_data = 0
     buildings_without_data = 0
     total_tenants = 0
-
-    for i, building in enumerate(buildings, 1):
-        print(f"   Processing: {building['name']}")
-
-        # Load tenant data
-        tenants = load_tenant_data(building['name'])
-        tenant_count = len(tenants['merchants']) + len(tenants['lawyers'])
-        contact_count = len(tenants['building_contacts'])
-
-        # Create placemark for all buildings (even without tenants, if they have building management)
-        if tenant_count > 0 or contact_count > 0:
-            buildings_with_data += 1
-            total_tenants += tenant_count
-            create_building_placemark(document, building, tenants)
-            print(f"     ✓ {tenant_count} tenants, {contact_count} management contacts")
-        else:
-            buildings_without_data += 1
-            print(f"     ⚠ No data found")
+    present_files = scan_tenant_files()
+
+    # Read every building's tenant CSVs concurrently; placemarks are still
+    # built and written in building order below
+    with ThreadPoolExecutor(max_workers=TENANT_LOAD_WORKERS) as executor:
+        tenants_by_building = list(executor.map(
+            lambda b: load_tenant_data(b['name'], present_files), buildings
+        ))
+
+    # Stream the KML straight into the KMZ archive (no intermediate .kml file)
+    with zipfile.ZipFile(OUTPUT_KMZ, 'w', zipfile.ZIP_DEFLATED) as kmz, \
+            kmz.open('doc.kml', 'w', force_zip64=True) as raw, \
+            io.TextIOWrapper(raw, encoding='utf-8') as f:
+        f.write(KML_HEADER)
+        for elem in header:
+            f.write(tostring(elem, encoding='unicode'))
+
+        for building, tenants in zip(buildings, tenants_by_building):
+            print(f"   Processing: {building['name']}")
+
+            tenant_count = len(tenants['merchants']) + len(tenants['lawyers'])
+            contact_count = len(tenants['building_contacts'])
+
+            # Create placemark for all buildings (even without tenants, if they have building management)
+            if tenant_count > 0 or contact_count > 0:
+                buildings_with_data += 1
+                total_tenants += tenant_count
+                placemark = create_building_placemark(building, tenants, today_str)
+                f.write(tostring(placemark, encoding='unicode'))
+                print(f"     ✓ {tenant_count} tenants, {contact_count} management contacts")
+            else:
+                buildings_without_data += 1
+                print(f"     ⚠ No data found")
+
+        f.write(KML_FOOTER)
 
     print(f"   Complete: {buildings_with_data} placemarks created")
-
-    # Save KML
-    print("\n4. Saving KML file...")
-    tree = ElementTree(kml)
-    tree.write(OUTPUT_KML, encoding='utf-8', xml_declaration=True)
-    print(f"   ✓ KML saved: {OUTPUT_KML}")
-
-    # Create KMZ (zipped KML)
-    print("\n5. Creating KMZ package...")
-    with zipfile.ZipFile(OUTPUT_KMZ, 'w', zipfile.ZIP_DEFLATED) as kmz:
-        kmz.write(OUTPUT_KML, arcname='doc.kml')
     print(f"   ✓ KMZ saved: {OUTPUT_KMZ}")
 
     # Print summary
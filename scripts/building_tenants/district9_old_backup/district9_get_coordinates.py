@@ -5,13 +5,14 @@ Creates district9_buildings.csv with building coordinates
 """
 
 import csv
-import json
-import os
 import sys
-import urllib.request
-import urllib.parse
 from pathlib import Path
 
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.geocoding import geocode_many, get_api_key
+
 # Building addresses to geocode
 DISTRICT9_BUILDINGS = [
     {
@@ -45,46 +46,6 @@ OUTPUT_DIR = Path(__file__).parent.parent / 'data'
 OUTPUT_FILE = OUTPUT_DIR / 'district9_buildings.csv'
 
 
-def geocode_address(address: str, api_key: str) -> dict:
-    """
-    Geocode an address using Google Geocoding API
-
-    Args:
-        address: Full address string
-        api_key: Google API key
-
-    Returns:
-        Dictionary with lat, lng, formatted_address
-    """
-    base_url = 'https://maps.googleapis.com/maps/api/geocode/json'
-    params = urllib.parse.urlencode({
-        'address': address,
-        'key': api_key
-    })
-    url = f"{base_url}?{params}"
-
-    try:
-        with urllib.request.urlopen(url, timeout=10) as response:
-            data = json.loads(response.read().decode('utf-8'))
-
-        if data['status'] == 'OK' and data['results']:
-            result = data['results'][0]
-            location = result['geometry']['location']
-
-            return {
-                'latitude': location['lat'],
-                'longitude': location['lng'],
-                'formatted_address': result['formatted_address']
-            }
-        else:
-            print(f"  ⚠️  Geocoding failed: {data.get('status', 'Unknown error')}")
-            return None
-
-    except Exception as e:
-        print(f"  ❌ Error geocoding: {e}")
-        return None
-
-
 def main():
     """Main function to geocode buildings and create CSV"""
     print("="*60)
@@ -93,7 +54,7 @@ def main():
     print()
 
     # Get API key from environment
-    api_key = os.getenv('GOOGLE_MAPS_API_KEY') or os.getenv('GOOGLE_PLACES_API_KEY')
+    api_key = get_api_key()
 
     if not api_key:
         print("❌ Error: GOOGLE_MAPS_API_KEY or GOOGLE_PLACES_API_KEY not found in environment")
@@ -103,14 +64,15 @@ def main():
     print(f"Processing {len(DISTRICT9_BUILDINGS)} buildings...")
     print()
 
-    # Geocode each building
+    # Geocode all buildings (shared cache + session), then report each one
+    results = geocode_many((b['address'] for b in DISTRICT9_BUILDINGS), api_key)
     buildings_with_coords = []
 
     for i, building in enumerate(DISTRICT9_BUILDINGS, 1):
         print(f"[{i}/{len(DISTRICT9_BUILDINGS)}] {building['name']}")
         print(f"  Address: {building['address']}")
 
-        coords = geocode_address(building['address'], api_key)
+        coords = results[building['address']]
 
         if coords:
             print(f"  ✓ Latitude: {coords['latitude']}")
@@ -4,22 +4,31 @@ Export Brooklyn & Queens Census Tract Median Household Income to KMZ
 Creates color-coded choropleth map similar to JusticeMap.org
 """
 
+import argparse
+import io
 import os
+import shutil
 import sys
+import time
 import requests
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from html import escape
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, List, TextIO, Tuple
 import json
-import xml.etree.ElementTree as ET
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-import geopandas as gpd
+import numpy as np
 import pandas as pd
-import simplekml
-from simplekml import Kml, Style, PolyStyle, LineStyle
+
+# geopandas/shapely (with pyogrio and pyproj) take seconds to import; they are
+# imported inside the functions that need them so --help and early errors stay fast
+if TYPE_CHECKING:
+    import geopandas as gpd
 
 
 # Paths
@@ -37,6 +46,23 @@ BROOKLYN_FIPS = "047"
 QUEENS_FIPS = "081"
 NY_STATE_FIPS = "36"
 
+# Parsed Census API response, reused for a week (ACS estimates change yearly)
+INCOME_CACHE = DATA_DIR / "brooklyn_queens_income_acs5_2023.parquet"
+INCOME_CACHE_TTL = 7 * 24 * 3600
+
+# Worker processes used to format placemarks
+KML_WORKERS = os.cpu_count() or 1
+
+# Block size for streaming the TIGER/Line download to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Geometry simplification: UTM zone 18N (meters) covers NYC; KML expects WGS84
+PROJECTED_CRS = "EPSG:32618"
+KML_CRS = "EPSG:4326"
+SIMPLIFY_TOLERANCE_METERS = 25
+# Decimal places kept for KML coordinates (5 decimals is ~1.1 m)
+COORD_DECIMALS = 5
+
 # Color bins for median household income (matching legend color scheme)
 # KML colors are in 'aabbggrr' format (alpha, blue, green, red)
 # 9-bin system with 30% opacity for most brackets, higher opacity for highest bracket
@@ -53,6 +79,27 @@ INCOME_BINS = [
     {"max": float('inf'), "color": "91FF00CC", "label": "$200,000+"}         # Dark Purple - 57% opacity (VISIBLE!)
 ]
 
+# Semi-transparent black/gray for missing data (30% opacity, matches reference)
+MISSING_DATA_COLOR = "4d000000"
+
+# KML is written directly as text: the structure is a fixed Document -> Folder ->
+# Placemark -> Polygon tree with one shared style per color. Popup HTML is
+# fixed markup around numeric fields, so it goes in CDATA without escaping.
+KML_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n<kml xmlns=\"http://www.opengis.net/kml/2.2\"><Document>\n"
+KML_FOOTER = "</Document></kml>\n"
+STYLE_TEMPLATE = (
+    '<Style id="{style_id}">'
+    '<LineStyle><color>ff000000</color><width>0.5</width></LineStyle>'  # Black outline
+    '<PolyStyle><color>{color}</color><fill>1</fill><outline>1</outline></PolyStyle>'
+    '</Style>\n'
+)
+PLACEMARK_TEMPLATE = (
+    '<Placemark><name>{name}</name><description><![CDATA[{description}]]></description>'
+    '<styleUrl>#{style_id}</styleUrl>'
+    '<Polygon><outerBoundaryIs><LinearRing><coordinates>{coordinates}</coordinates>'
+    '</LinearRing></outerBoundaryIs></Polygon></Placemark>\n'
+)
+
 
 def download_census_tracts() -> Path:
     """Download TIGER/Line shapefiles for Brooklyn and Queens census tracts"""
@@ -67,20 +114,13 @@ def download_census_tracts() -> Path:
 
     if not zip_path.exists():
         print(f"   Downloading from {url}...")
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
-
-        with open(zip_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0:
-                    percent = (downloaded / total_size) * 100
-                    print(f"\r   Progress: {percent:.1f}%", end='')
-        print()
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            # Copy in 1 MB blocks straight from the socket to disk
+            with open(zip_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+        print(f"   Downloaded {zip_path.stat().st_size / 1024 / 1024:.1f} MB")
 
         # Extract shapefile
         print("   Extracting shapefile...")
@@ -98,6 +138,12 @@ def fetch_income_data() -> pd.DataFrame:
     """Fetch median household income data from Census ACS API"""
     print("\n2. Fetching median household income data from Census API...")
 
+    # Reuse the income table from a recent run instead of querying the API again
+    if INCOME_CACHE.exists() and time.time() - INCOME_CACHE.stat().st_mtime < INCOME_CACHE_TTL:
+        df = pd.read_parquet(INCOME_CACHE)
+        print(f"   ✓ Using cached income data at {INCOME_CACHE} ({len(df)} tracts)")
+        return df
+
     # Build API request for both Brooklyn and Queens
     params = {
         'get': 'NAME,B19013_001E',  # B19013_001E = Median Household Income
@@ -130,23 +176,31 @@ def fetch_income_data() -> pd.DataFrame:
     )
 
     print(f"   ✓ Fetched {len(df)} census tracts")
-    print(f"      Brooklyn: {len(df[df['borough'] == 'Brooklyn'])} tracts")
-    print(f"      Queens: {len(df[df['borough'] == 'Queens'])} tracts")
+    borough_counts = df['borough'].value_counts()
+    print(f"      Brooklyn: {borough_counts.get('Brooklyn', 0)} tracts")
+    print(f"      Queens: {borough_counts.get('Queens', 0)} tracts")
     print(f"      Tracts with income data: {df['median_income'].notna().sum()}")
 
-    return df[['GEOID', 'NAME', 'borough', 'median_income']]
+    df = df[['GEOID', 'NAME', 'borough', 'median_income']]
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(INCOME_CACHE, index=False)
 
+    return df
 
-def merge_geo_and_income(shapefile_path: Path, income_df: pd.DataFrame) -> gpd.GeoDataFrame:
+
+def merge_geo_and_income(shapefile_path: Path, income_df: pd.DataFrame) -> 'gpd.GeoDataFrame':
     """Merge census tract geometries with income data"""
+    import geopandas as gpd
+    import shapely
+
     print("\n3. Merging geometries with income data...")
 
-    # Read shapefile
+    # Read shapefile, letting OGR skip every county except Brooklyn and Queens
     print(f"   Loading shapefile: {shapefile_path}")
-    gdf = gpd.read_file(shapefile_path)
-
-    # Filter to Brooklyn and Queens only
-    gdf = gdf[gdf['COUNTYFP'].isin([BROOKLYN_FIPS, QUEENS_FIPS])].copy()
+    gdf = gpd.read_file(
+        shapefile_path,
+        where=f"COUNTYFP IN ('{BROOKLYN_FIPS}', '{QUEENS_FIPS}')"
+    )
     print(f"   ✓ Loaded {len(gdf)} tracts for Brooklyn & Queens")
 
     # Merge with income data (rename NAME to avoid conflict)
@@ -154,42 +208,122 @@ def merge_geo_and_income(shapefile_path: Path, income_df: pd.DataFrame) -> gpd.G
     merged = gdf.merge(income_df_renamed, on='GEOID', how='left')
     print(f"   ✓ Merged {len(merged)} tracts with income data")
 
-    # Simplify geometries to reduce file size
+    # Take the borough from the shapefile's county, so tracts the Census API
+    # returned no row for still get one (and a folder)
+    merged['borough'] = np.where(merged['COUNTYFP'] == BROOKLYN_FIPS, 'Brooklyn', 'Queens')
+
+    # Simplify geometries to reduce file size. This is done in a metric CRS so
+    # the tolerance is a fixed ground distance rather than latitude-dependent degrees.
     print("   Simplifying geometries...")
-    merged['geometry'] = merged['geometry'].simplify(tolerance=0.0001, preserve_topology=True)
+    projected = merged.to_crs(PROJECTED_CRS)
+    if hasattr(shapely, 'coverage_simplify'):
+        # Tracts tile the boroughs, so simplify them as one coverage: shared
+        # borders are simplified once and neighbours stay gap-free
+        projected['geometry'] = shapely.coverage_simplify(
+            projected.geometry.values, tolerance=SIMPLIFY_TOLERANCE_METERS
+        )
+    else:
+        # shapely < 2.1: simplify each tract on its own
+        projected['geometry'] = projected['geometry'].simplify(
+            tolerance=SIMPLIFY_TOLERANCE_METERS, preserve_topology=True
+        )
+    merged = projected.to_crs(KML_CRS)
 
     return merged
 
 
-def get_color_for_income(income: Optional[float]) -> str:
-    """Get color code based on income bin"""
-    if pd.isna(income):
-        return "4d000000"  # Semi-transparent black/gray for missing data (30% opacity, matches reference)
+def add_income_colors(gdf: 'gpd.GeoDataFrame') -> 'gpd.GeoDataFrame':
+    """Add a 'color' column with each tract's income-bin color (one vectorized pass)"""
+    # Bins are right-open to match "income < max" for each entry of INCOME_BINS
+    bins = [float('-inf')] + [bin_config['max'] for bin_config in INCOME_BINS]
+    labels = [bin_config['color'] for bin_config in INCOME_BINS]
+    colors = pd.cut(gdf['median_income'], bins=bins, labels=labels, right=False)
+    gdf['color'] = colors.astype(object).fillna(MISSING_DATA_COLOR)
+    return gdf
+
+
+
+def add_placemark_text(gdf: 'gpd.GeoDataFrame') -> 'gpd.GeoDataFrame':
+    """Add 'placemark_name' and 'description' columns built with vectorized string ops"""
+    has_income = gdf['median_income'].notna()
+    income_text = gdf['median_income'].map('${:,.0f}'.format, na_action='ignore')
+
+    gdf['placemark_name'] = 'Tract ' + gdf['TRACTCE'] + ': ' + income_text.fillna('No Data')
+
+    footer = has_income.map({
+        True: '<br/>\n<br/>\n<i>Source: US Census ACS 2022 5-Year Estimates</i>\n',
+        False: '<br/>\n<br/>\n<i>Data may be unavailable due to insufficient sample size</i>\n',
+    })
+    # One fragment per field (label + value), joined in a single str.cat pass
+    fragments = [
+        '<br/>\n<b>Borough:</b> ' + gdf['borough'],
+        '<br/>\n<b>Median Household Income:</b> ' + income_text.fillna('No Data Available'),
+        '<br/>\n<b>GEOID:</b> ' + gdf['GEOID'],
+        footer,
+    ]
+    gdf['description'] = ('\n<b>Census Tract:</b> ' + gdf['TRACTCE']).str.cat(fragments)
+    return gdf
+
+def keep_largest_parts(gdf: 'gpd.GeoDataFrame') -> 'gpd.GeoDataFrame':
+    """Replace each MultiPolygon with its largest Polygon (only one outer ring is exported)"""
+    is_multi = gdf.geom_type == 'MultiPolygon'
+    if is_multi.any():
+        parts = gdf.geometry[is_multi].explode(index_parts=True)
+        largest = parts.loc[parts.area.groupby(level=0).idxmax()]
+        largest.index = largest.index.droplevel(1)
+        gdf.loc[largest.index, 'geometry'] = largest
+    return gdf
+
+def add_ring_coordinates(gdf: 'gpd.GeoDataFrame') -> 'gpd.GeoDataFrame':
+    """
+    Add a 'ring' column with each tract's rounded exterior ring vertices
+
+    All vertices come out of GEOS in one bulk call and are rounded to
+    COORD_DECIMALS in a single NumPy pass, then split back per tract.
+    """
+    import shapely
+
+    rings = shapely.get_exterior_ring(gdf.geometry.values)
+    coords, index = shapely.get_coordinates(rings, return_index=True)
+    coords = coords.round(COORD_DECIMALS)
+    splits = np.searchsorted(index, np.arange(1, len(gdf)))
+    gdf['ring'] = pd.Series(np.split(coords, splits), index=gdf.index, dtype=object)
+    return gdf
+
+
+def format_placemark(name: str, description: str, style_id: str, coords: np.ndarray) -> str:
+    """Format one tract Placemark (outer ring only) as a KML string"""
+    # Vertices are already rounded (see add_ring_coordinates), so repr stays short
+    coordinates = ' '.join(f"{lon},{lat}" for lon, lat in coords.tolist())
+    return PLACEMARK_TEMPLATE.format(
+        name=escape(name),
+        description=description,
+        style_id=style_id,
+        coordinates=coordinates
+    )
 
-    for bin_config in INCOME_BINS:
-        if income < bin_config['max']:
-            return bin_config['color']
 
-    return INCOME_BINS[-1]['color']
+def render_placemarks(records: List[Tuple[str, str, str, np.ndarray]]) -> str:
+    """Format a chunk of (name, description, style_id, coords) records (runs in a worker process)"""
+    return ''.join(format_placemark(*record) for record in records)
 
 
-def create_kmz(gdf: gpd.GeoDataFrame) -> None:
-    """Generate KML/KMZ file with color-coded census tracts"""
-    print("\n4. Creating KML/KMZ file...")
+def write_kml(out: TextIO, gdf: 'gpd.GeoDataFrame') -> Tuple[int, int]:
+    """
+    Write the full KML document for the tracts to an open text stream
 
-    # Create KML object with shared styles at Document level for Google My Maps compatibility
-    kml = Kml()
-    kml.document.name = "Brooklyn & Queens Median Household Income"
-    # Enable shared styles - styles must be at Document level for Google My Maps
-    kml.document.sharestyle = True
-    kml.document.description = f"""
+    Returns:
+        (total tracts, tracts without income data)
+    """
+    borough_counts = gdf['borough'].value_counts()
+    description = f"""
 Census Tract Level Median Household Income
 Data Source: US Census Bureau American Community Survey (ACS) 2022 5-Year Estimates
 Table B19013: Median Household Income in the Past 12 Months
 
 Total Census Tracts: {len(gdf)}
-Brooklyn: {len(gdf[gdf['borough'] == 'Brooklyn'])}
-Queens: {len(gdf[gdf['borough'] == 'Queens'])}
+Brooklyn: {borough_counts.get('Brooklyn', 0)}
+Queens: {borough_counts.get('Queens', 0)}
 
 Color Legend:
 {''.join([f'• {bin["label"]}' + chr(10) for bin in INCOME_BINS])}
@@ -197,179 +331,96 @@ Color Legend:
 Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}
 """
 
-    # Add legend as a screen overlay description
-    legend_text = "\\n".join([f"{bin['label']}" for bin in INCOME_BINS])
+    out.write(KML_HEADER)
+    out.write(f"<name>{escape('Brooklyn & Queens Median Household Income')}</name>\n")
+    out.write(f"<description>{escape(description)}</description>\n")
 
-    # Create shared styles at Document level (before creating Folders)
-    # Google My Maps only resolves styleUrl references when styles are at Document level
+    # Shared styles must be at Document level (before the Folders) for Google My Maps
     print("   Creating shared styles at Document level...")
-    color_to_style_id: Dict[str, str] = {}
-    
-    # Create a style for each unique color in INCOME_BINS
-    for bin_config in INCOME_BINS:
-        color = bin_config['color']
-        if color not in color_to_style_id:
-            # Create a unique style ID based on color
-            style_id = f"poly-{color}"
-            style = Style()
-            style._id = style_id
-            style.polystyle = PolyStyle(color=color, fill=1, outline=1)
-            style.linestyle = LineStyle(color="ff000000", width=0.5)  # Black outline
-            kml.document.styles.append(style)
-            color_to_style_id[color] = style_id
-    
-    # Create style for missing data
-    missing_data_color = "4d000000"
-    if missing_data_color not in color_to_style_id:
-        style_id = f"poly-{missing_data_color}"
-        style = Style()
-        style._id = style_id
-        style.polystyle = PolyStyle(color=missing_data_color, fill=1, outline=1)
-        style.linestyle = LineStyle(color="ff000000", width=0.5)  # Black outline
-        kml.document.styles.append(style)
-        color_to_style_id[missing_data_color] = style_id
-    
-    print(f"   ✓ Created {len(color_to_style_id)} shared styles at Document level")
-
-    # Create folders for Brooklyn and Queens
-    brooklyn_folder = kml.newfolder(name=f"Brooklyn ({len(gdf[gdf['borough'] == 'Brooklyn'])} tracts)")
-    queens_folder = kml.newfolder(name=f"Queens ({len(gdf[gdf['borough'] == 'Queens'])} tracts)")
+    colors = dict.fromkeys([bin_config['color'] for bin_config in INCOME_BINS] + [MISSING_DATA_COLOR])
+    for color in colors:
+        out.write(STYLE_TEMPLATE.format(style_id=f"poly-{color}", color=color))
+    print(f"   ✓ Created {len(colors)} shared styles at Document level")
 
     # Track statistics
     total_tracts = 0
-    missing_data = 0
-
-    # Add each census tract as a polygon
-    for idx, row in gdf.iterrows():
-        total_tracts += 1
-
-        # Get census tract info
-        geoid = row['GEOID']
-        tract_name = row.get('tract_name', f"Tract {row['TRACTCE']}")
-        borough = row['borough']
-        income = row['median_income']
-        geometry = row['geometry']
-
-        # Choose folder
-        folder = brooklyn_folder if borough == 'Brooklyn' else queens_folder
-
-        # Create placemark name (show income if available)
-        if pd.notna(income):
-            placemark_name = f"Tract {row['TRACTCE']}: ${income:,.0f}"
-        else:
-            placemark_name = f"Tract {row['TRACTCE']}: No Data"
-            missing_data += 1
-
-        # Create polygon
-        pol = folder.newpolygon(name=placemark_name)
-
-        # Extract coordinates from geometry
-        if geometry.geom_type == 'Polygon':
-            coords = list(geometry.exterior.coords)
-        elif geometry.geom_type == 'MultiPolygon':
-            # Use largest polygon for multipolygon
-            largest = max(geometry.geoms, key=lambda p: p.area)
-            coords = list(largest.exterior.coords)
-        else:
-            continue
-
-        # Set polygon coordinates (lon, lat)
-        pol.outerboundaryis = coords
-
-        # CRITICAL: Use styleUrl references to Document-level styles for Google My Maps compatibility
-        # Google My Maps only resolves styleUrl references when styles are at Document level
-        color = get_color_for_income(income)
-        style_id = color_to_style_id[color]
-        pol.styleurl = f"#{style_id}"
-
-        # Add popup description
-        if pd.notna(income):
-            description = f"""
-<b>Census Tract:</b> {row['TRACTCE']}<br/>
-<b>Borough:</b> {borough}<br/>
-<b>Median Household Income:</b> ${income:,.0f}<br/>
-<b>GEOID:</b> {geoid}<br/>
-<br/>
-<i>Source: US Census ACS 2022 5-Year Estimates</i>
-"""
-        else:
-            description = f"""
-<b>Census Tract:</b> {row['TRACTCE']}<br/>
-<b>Borough:</b> {borough}<br/>
-<b>Median Household Income:</b> No Data Available<br/>
-<b>GEOID:</b> {geoid}<br/>
-<br/>
-<i>Data may be unavailable due to insufficient sample size</i>
-"""
-        pol.description = description
+    missing_data = int(gdf['median_income'].isna().sum())
+
+    # CRITICAL: Use styleUrl references to Document-level styles for Google My Maps compatibility
+    gdf['style_id'] = 'poly-' + gdf['color']
+
+    # Placemarks are independent, so chunks of them are formatted in parallel
+    # worker processes and written back in their original order
+    pool = ProcessPoolExecutor(max_workers=KML_WORKERS) if KML_WORKERS > 1 else nullcontext()
+    with pool as executor:
+        render = executor.map if executor else map
+
+        # Add each census tract as a polygon, one borough (and folder) at a time
+        for borough, borough_gdf in gdf.groupby('borough'):
+            out.write(f"<Folder><name>{borough} ({borough_counts[borough]} tracts)</name>\n")
+
+            # Only Polygons have an exterior ring (MultiPolygons were reduced to their largest part)
+            records = [
+                record for record in zip(
+                    borough_gdf['placemark_name'], borough_gdf['description'],
+                    borough_gdf['style_id'], borough_gdf['ring']
+                )
+                if len(record[3])
+            ]
+            total_tracts += len(borough_gdf)
+
+            chunk_size = max(1, -(-len(records) // KML_WORKERS))
+            chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+            for placemarks in render(render_placemarks, chunks):
+                out.write(placemarks)
 
-        # Progress indicator
-        if total_tracts % 100 == 0:
             print(f"   Progress: {total_tracts} tracts processed...")
+            out.write("</Folder>\n")
+
+    out.write(KML_FOOTER)
+    return total_tracts, missing_data
+
+
+def create_kmz(gdf: 'gpd.GeoDataFrame', keep_kml: bool = False) -> None:
+    """
+    Generate KMZ file with color-coded census tracts
+
+    Args:
+        gdf: Merged tract geometries and income data
+        keep_kml: Also write the uncompressed KML next to the KMZ
+    """
+    print("\n4. Creating KML/KMZ file...")
+
+    # Resolve every tract's fill color, popup text and exported ring up front instead of per row
+    gdf = add_income_colors(gdf)
+    gdf = add_placemark_text(gdf)
+    gdf = keep_largest_parts(gdf)
+    gdf = add_ring_coordinates(gdf)
+
+    # Write the KML straight into the KMZ archive, without building it in memory first
+    EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    # KML is highly repetitive XML; maximum deflate costs little extra time
+    with zipfile.ZipFile(OUTPUT_KMZ, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as kmz:
+        with kmz.open('doc.kml', 'w', force_zip64=True) as raw, \
+                io.TextIOWrapper(raw, encoding='utf-8') as f:
+            total_tracts, missing_data = write_kml(f, gdf)
+        kml_bytes = kmz.getinfo('doc.kml').file_size
 
     print(f"   ✓ Processed {total_tracts} census tracts")
     print(f"      Tracts with data: {total_tracts - missing_data}")
     print(f"      Tracts without data: {missing_data}")
 
-    # Save KML
     print("\n5. Saving files...")
-    EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
-
-    kml.save(str(OUTPUT_KML))
-    print(f"   ✓ KML saved: {OUTPUT_KML}")
-
-    # Post-process KML to add styleUrl to Placemark elements based on polygon color
-    # This is needed because simplekml doesn't easily support setting styleurl on Placemarks
-    print("   Post-processing KML to add styleUrl to Placemarks...")
-    tree = ET.parse(OUTPUT_KML)
-    root = tree.getroot()
-    
-    # Register KML namespace
-    ET.register_namespace('', 'http://www.opengis.net/kml/2.2')
-    kml_ns = '{http://www.opengis.net/kml/2.2}'
-    
-    # Process each polygon and add styleUrl to its parent Placemark
-    for idx, row in gdf.iterrows():
-        income = row['median_income']
-        color = get_color_for_income(income)
-        style_id = color_to_style_id[color]
-        
-        # Find the Placemark by matching GEOID in the description (more unique than tract number)
-        geoid = row['GEOID']
-        borough = row['borough']
-        tract_ce = row['TRACTCE']
-        
-        for placemark in root.iter(f'{kml_ns}Placemark'):
-            # Check description for GEOID to uniquely identify the placemark
-            desc_elem = placemark.find(f'{kml_ns}description')
-            if desc_elem is not None and geoid in desc_elem.text:
-                # Also verify borough matches to be extra sure
-                if borough in desc_elem.text:
-                    # Check if Placemark doesn't already have a styleUrl
-                    if placemark.find(f'{kml_ns}styleUrl') is None:
-                        # Create styleUrl element for Placemark
-                        styleurl_new = ET.Element(f'{kml_ns}styleUrl')
-                        styleurl_new.text = f"#{style_id}"
-                        # Insert styleUrl after description but before Polygon
-                        insert_pos = 0
-                        for i, child in enumerate(placemark):
-                            if child.tag.endswith('description'):
-                                insert_pos = i + 1
-                                break
-                        placemark.insert(insert_pos, styleurl_new)
-                    break
-    
-    # Save the fixed KML with proper namespace handling
-    tree.write(OUTPUT_KML, encoding='utf-8', xml_declaration=True)
-    print(f"   ✓ KML post-processed: {OUTPUT_KML}")
-
-    # Create KMZ (zipped KML)
-    with zipfile.ZipFile(OUTPUT_KMZ, 'w', zipfile.ZIP_DEFLATED) as kmz:
-        kmz.write(OUTPUT_KML, arcname='doc.kml')
     print(f"   ✓ KMZ saved: {OUTPUT_KMZ}")
 
+    if keep_kml:
+        with zipfile.ZipFile(OUTPUT_KMZ) as kmz, kmz.open('doc.kml') as src, \
+                open(OUTPUT_KML, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        print(f"   ✓ KML saved: {OUTPUT_KML}")
+
     # File sizes
-    kml_size = OUTPUT_KML.stat().st_size / 1024 / 1024
+    kml_size = kml_bytes / 1024 / 1024
     kmz_size = OUTPUT_KMZ.stat().st_size / 1024 / 1024
     print(f"   KML size: {kml_size:.1f} MB")
     print(f"   KMZ size: {kmz_size:.1f} MB")
@@ -377,6 +428,11 @@ Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}
 
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description='Export Brooklyn & Queens median household income to KMZ')
+    parser.add_argument('--keep-kml', action='store_true',
+                        help=f'Also write the uncompressed KML to {OUTPUT_KML.name}')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("BROOKLYN & QUEENS: MEDIAN HOUSEHOLD INCOME MAP")
     print("=" * 60)
@@ -392,7 +448,7 @@ def main():
         gdf = merge_geo_and_income(shapefile_path, income_df)
 
         # Step 4: Create KMZ
-        create_kmz(gdf)
+        create_kmz(gdf, keep_kml=args.keep_kml)
 
         # Summary
         print("\n" + "=" * 60)
@@ -4,59 +4,73 @@ Fix KML file by moving styles from Folder level to Document level
 Google My Maps requires styles at Document level, not Folder level
 """
 
-import re
+import mmap
+import xml.etree.ElementTree as ET
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 KML_FILE = PROJECT_ROOT / "data" / "census" / "exports" / "brooklyn_queens_income.kml"
 
-def fix_kml_styles(kml_path: Path):
-    """Move all <Style> elements from Folder to Document level"""
-    print(f"Fixing KML styles in {kml_path}...")
+KML_NS = "http://www.opengis.net/kml/2.2"
+NS = {'kml': KML_NS}
 
-    # Read KML file
-    with open(kml_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+# Fully qualified tag names, built once instead of per element
+STYLE_TAG = f'{{{KML_NS}}}Style'
+DOCUMENT_HEADER_TAGS = {f'{{{KML_NS}}}name', f'{{{KML_NS}}}description'}
 
-    # Extract all <Style>...</Style> blocks from the file
-    style_pattern = r'<Style id="(\d+)".*?</Style>\s*'
-    styles = re.findall(style_pattern, content, re.DOTALL)
+# Keep the default KML namespace (and gx) unprefixed when writing back
+ET.register_namespace('', KML_NS)
+ET.register_namespace('gx', "http://www.google.com/kml/ext/2.2")
 
-    print(f"Found {len(styles)} style elements")
+def is_shared_style(element: ET.Element) -> bool:
+    """A <Style> with an id, referenced by styleUrl; id-less styles are inline to their Placemark"""
+    return element.tag == STYLE_TAG and element.get('id') is not None
 
-    # Extract full style blocks
-    style_blocks = re.findall(r'(<Style id="\d+".*?</Style>)', content, re.DOTALL)
+def fix_kml_styles(kml_path: Path):
+    """Move all shared <Style> elements from Folder to Document level"""
+    print(f"Fixing KML styles in {kml_path}...")
 
-    # Remove styles from their current locations
-    for style_block in style_blocks:
-        content = content.replace(style_block + '\n', '', 1)
+    # Parse KML file once, feeding the parser from a read-only memory map
+    # instead of buffered reads of the whole file
+    with open(kml_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        tree = ET.parse(mm)
+    document = tree.getroot().find('kml:Document', NS)
 
-    # Find the </description> tag after Document and insert styles there
-    # This puts styles at Document level
-    insert_point = content.find('</description>', content.find('<Document'))
-
-    if insert_point == -1:
+    if document is None:
         print("Error: Could not find insertion point")
         return False
 
-    # Move past the </description> tag and newline
-    insert_point = content.find('\n', insert_point) + 1
-
-    # Create styles section
-    styles_section = '\n        <!-- Styles moved to Document level for Google My Maps compatibility -->\n'
-    for style_block in style_blocks:
-        # Indent properly for Document level
-        indented_style = '        ' + style_block.replace('\n', '\n        ')
-        styles_section += indented_style + '\n'
-
-    # Insert styles at Document level
-    content = content[:insert_point] + styles_section + content[insert_point:]
+    # Find every shared <Style> that is not already a direct child of Document
+    nested_styles = []
+    style_parents = []
+    for parent in document.iter():
+        if parent is document:
+            continue
+        styles = [child for child in parent if is_shared_style(child)]
+        if styles:
+            nested_styles.extend(styles)
+            style_parents.append(parent)
+
+    print(f"Found {len(nested_styles)} style elements")
+
+    # Remove styles from their current locations, rebuilding each parent's
+    # children once instead of one Element.remove() scan per style
+    for parent in style_parents:
+        parent[:] = [child for child in parent if not is_shared_style(child)]
+
+    # Insert styles right after the Document's <name>/<description>
+    # This puts styles at Document level
+    insert_at = 0
+    for index, child in enumerate(document):
+        if child.tag in DOCUMENT_HEADER_TAGS:
+            insert_at = index + 1
+    document[insert_at:insert_at] = nested_styles
 
     # Write fixed KML
-    with open(kml_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    ET.indent(tree, space='    ')
+    tree.write(kml_path, encoding='utf-8', xml_declaration=True)
 
-    print(f"✓ Moved {len(style_blocks)} styles to Document level")
+    print(f"✓ Moved {len(nested_styles)} styles to Document level")
     return True
 
 if __name__ == "__main__":
@@ -5,16 +5,51 @@ Geocode NJ churches and create optimized driving routes for each circled area
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
 import time
 import json
 import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from typing import List, Tuple, Dict
 import numpy as np
-from scipy.spatial.distance import cdist
+
+# Try to import numba to JIT-compile the 2-opt kernel
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 # API key for HERE Geocoding API
 HERE_API_KEY = os.environ.get('HERE_API_KEY', '0zt1IVbSQt3cPrM8_jaLXyFoq9TALX4OPXWfIsxGg1s')
 
+# Concurrent geocoding requests, and minimum delay between two requests across
+# all of them (keeps us at HERE's 5 requests/second limit)
+GEOCODE_WORKERS = 10
+MIN_REQUEST_INTERVAL = 0.2
+
+# 2-opt only tries reconnecting each stop to this many of its nearest stops
+TWO_OPT_NEIGHBORS = 20
+
+# Circles are routed independently, one per process
+ROUTE_WORKERS = os.cpu_count() or 1
+
+# One keep-alive connection pool shared by all geocoding threads, retrying
+# rate-limit and server errors with backoff
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=GEOCODE_WORKERS,
+    pool_maxsize=GEOCODE_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+_rate_lock = threading.Lock()
+_last_request = 0.0
+
 # Define the 7 circles based on the map image description
 # Format: (name, center_lat, center_lng, radius_km, description)
 CIRCLES = [
@@ -27,6 +62,28 @@ CIRCLES = [
     ("Circle7_Southeast_Secaucus", 40.790, -74.060, 3.0, "Secaucus and surrounding areas"),
 ]
 
+def load_church_sheet(excel_path: str, cache_path: str) -> pd.DataFrame:
+    """Read the church spreadsheet, via a Parquet copy that is rebuilt when the sheet changes"""
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(excel_path):
+        return pd.read_parquet(cache_path)
+
+    df = pd.read_excel(excel_path, sheet_name=0)
+    try:
+        df.to_parquet(cache_path, index=False)
+    except (ValueError, TypeError) as e:
+        # Columns mixing numbers and text can't be stored; just read the sheet next time
+        print(f"   ⚠️  Could not cache {excel_path} as Parquet: {e}")
+    return df
+
+def _throttle() -> None:
+    """Block until MIN_REQUEST_INTERVAL has passed since the last request"""
+    global _last_request
+    with _rate_lock:
+        wait = _last_request + MIN_REQUEST_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request = time.monotonic()
+
 def geocode_address(address: str) -> Tuple[float, float]:
     """Geocode an address using HERE Geocoding API"""
     try:
@@ -37,7 +94,8 @@ def geocode_address(address: str) -> Tuple[float, float]:
             'limit': 1
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        _throttle()
+        response = SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
 
         data = response.json()
@@ -53,63 +111,191 @@ def geocode_address(address: str) -> Tuple[float, float]:
         print(f"  Error geocoding {address}: {e}")
         return None, None
 
-def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Calculate distance in km between two points using Haversine formula"""
-    from math import radians, sin, cos, sqrt, atan2
-
+def open_progress_db(db_path: str, legacy_json_path: str) -> sqlite3.Connection:
+    """
+    Open the address -> coordinates cache, importing the old JSON progress
+    file the first time so earlier geocoding runs are not repeated
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS geo(address TEXT PRIMARY KEY, lat REAL, lng REAL)")
+
+    is_empty = conn.execute("SELECT COUNT(*) FROM geo").fetchone()[0] == 0
+    if is_empty and os.path.exists(legacy_json_path):
+        with open(legacy_json_path, 'r') as f:
+            legacy = json.load(f)
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO geo VALUES (?, ?, ?)",
+                             [(address, lat, lng) for address, (lat, lng) in legacy.items()])
+        print(f"   Imported {len(legacy)} geocoded addresses from {legacy_json_path}")
+
+    return conn
+
+def haversine_vec(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Haversine distance in km, element-wise over (broadcastable) NumPy arrays"""
     R = 6371  # Earth's radius in km
 
-    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
     dlat = lat2 - lat1
     dlng = lng2 - lng1
 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
 
     return R * c
 
-def point_in_circle(lat: float, lng: float, circle_center_lat: float,
-                    circle_center_lng: float, radius_km: float) -> bool:
-    """Check if a point is within a circle"""
-    distance = calculate_distance(lat, lng, circle_center_lat, circle_center_lng)
-    return distance <= radius_km
+def haversine_matrix(coords: np.ndarray) -> np.ndarray:
+    """Pairwise Haversine distances in km for an (n, 2) array of [lat, lng]"""
+    return haversine_vec(coords[:, 0:1], coords[:, 1:2], coords[None, :, 0], coords[None, :, 1])
+
+def planar_matrix(coords: np.ndarray, origin: Tuple[float, float]) -> np.ndarray:
+    """
+    Pairwise distances in km after an equirectangular projection around origin
+
+    Within a few km of origin this is close enough to Haversine to rank
+    routes, and needs no trig per pair.
+    """
+    lat0, lng0 = origin
+    x = 6371 * np.radians(coords[:, 1] - lng0) * np.cos(np.radians(lat0))
+    y = 6371 * np.radians(coords[:, 0] - lat0)
+    return np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
 
-def nearest_neighbor_route(points: List[Dict], start_idx: int = 0) -> List[int]:
+def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Calculate distance in km between two points using Haversine formula"""
+    return float(haversine_vec(lat1, lng1, lat2, lng2))
+
+def nearest_neighbor_route(distances: np.ndarray, start_idx: int = 0) -> List[int]:
     """
-    Solve TSP using nearest neighbor heuristic
+    Solve TSP using nearest neighbor heuristic on a pre-computed distance matrix
     Returns list of indices representing the optimal route order
     """
-    if len(points) <= 1:
-        return list(range(len(points)))
+    n = distances.shape[0]
 
-    # Create distance matrix
-    coords = np.array([[p['latitude'], p['longitude']] for p in points])
-    distances = cdist(coords, coords, metric='euclidean')
+    if n <= 1:
+        return list(range(n))
 
-    n = len(points)
-    unvisited = set(range(n))
+    visited = np.zeros(n, dtype=bool)
+    visited[start_idx] = True
     route = [start_idx]
-    unvisited.remove(start_idx)
 
     current = start_idx
-    while unvisited:
+    for _ in range(n - 1):
         # Find nearest unvisited point
-        nearest = min(unvisited, key=lambda x: distances[current][x])
-        route.append(nearest)
-        unvisited.remove(nearest)
-        current = nearest
+        row = distances[current].copy()
+        row[visited] = np.inf
+        current = int(np.argmin(row))
+        visited[current] = True
+        route.append(current)
+
+    return route
+
+def _two_opt_kernel(distances: np.ndarray, route: np.ndarray, neighbors: np.ndarray,
+                    max_iterations: int) -> np.ndarray:
+    """
+    Scalar-loop 2-opt, JIT-compiled with numba when it is installed
+
+    Same moves as the NumPy path in optimize_route_2opt: for each i the best
+    improving near-neighbor segment end j is taken (first one on ties), and
+    stops with nothing to improve are skipped until their edge changes.
+    """
+    n = route.shape[0]
+    position = np.empty(n, dtype=np.int64)
+    for idx in range(n):
+        position[route[idx]] = idx
+    dont_look = np.zeros(n, dtype=np.bool_)
+
+    improved = True
+    iteration = 0
+
+    while improved and iteration < max_iterations:
+        improved = False
+        iteration += 1
+
+        for i in range(1, n - 2):
+            prev_stop = route[i - 1]
+            if dont_look[prev_stop]:
+                continue
+
+            first = route[i]
+            best_delta = -1e-12
+            best_end = -1
+
+            for k in range(2 * neighbors.shape[1]):
+                # New edge (prev_stop, last) or (first, next_stop) joins near neighbors
+                if k < neighbors.shape[1]:
+                    j = position[neighbors[prev_stop, k]]
+                else:
+                    j = position[neighbors[first, k - neighbors.shape[1]]] - 1
+                if j < i + 2:
+                    continue
+                last = route[j]
+                next_stop = route[(j + 1) % n]
+                delta = (
+                    distances[prev_stop, last] + distances[first, next_stop]
+                    - distances[prev_stop, first] - distances[last, next_stop]
+                )
+                if delta < best_delta:
+                    best_delta = delta
+                    best_end = j
+
+            if best_end < 0:
+                dont_look[prev_stop] = True
+                continue
+
+            # Reverse the segment in place. Every stop in it now leads into a
+            # different edge, so they get looked at again along with prev_stop
+            dont_look[prev_stop] = False
+            lo, hi = i, best_end
+            while lo < hi:
+                route[lo], route[hi] = route[hi], route[lo]
+                position[route[lo]] = lo
+                position[route[hi]] = hi
+                dont_look[route[lo]] = False
+                dont_look[route[hi]] = False
+                lo += 1
+                hi -= 1
+            dont_look[route[lo]] = False
+            improved = True
 
     return route
 
-def optimize_route_2opt(points: List[Dict], initial_route: List[int], max_iterations: int = 1000) -> List[int]:
+if NUMBA_AVAILABLE:
+    _two_opt_kernel = njit(cache=True)(_two_opt_kernel)
+
+def nearest_neighbors(distances: np.ndarray, k: int) -> np.ndarray:
+    """Indices of each stop's k closest other stops, nearest first"""
+    distances = distances.copy()
+    np.fill_diagonal(distances, np.inf)
+    return np.ascontiguousarray(np.argsort(distances, axis=1, kind='stable')[:, :k], dtype=np.int64)
+
+def optimize_route_2opt(distances: np.ndarray, initial_route: List[int],
+                        max_iterations: int = 1000) -> List[int]:
     """
-    Improve route using 2-opt algorithm
+    Improve route using 2-opt algorithm on a pre-computed distance matrix
+
+    For each position i, only segment ends j that reconnect route[i-1] or
+    route[i] to one of its TWO_OPT_NEIGHBORS nearest stops are scored, at once
+    with NumPy, and the best improving reversal is applied. A don't-look bit
+    skips stops whose neighborhood had nothing to offer until their outgoing
+    edge changes. With numba installed the same search runs in the compiled
+    _two_opt_kernel instead.
     """
-    if len(points) <= 3:
+    n = len(initial_route)
+
+    if n <= 3:
         return initial_route
 
-    coords = np.array([[points[i]['latitude'], points[i]['longitude']] for i in initial_route])
-    route = list(range(len(initial_route)))
+    neighbors = nearest_neighbors(distances, min(TWO_OPT_NEIGHBORS, n - 1))
+
+    if NUMBA_AVAILABLE:
+        route = np.array(initial_route, dtype=np.int64)
+        return _two_opt_kernel(distances, route, neighbors, max_iterations).tolist()
+
+    route = np.array(initial_route)
+    position = np.empty(n, dtype=np.int64)
+    position[route] = np.arange(n)
+    dont_look = np.zeros(n, dtype=bool)
 
     improved = True
     iteration = 0
@@ -118,29 +304,83 @@ def optimize_route_2opt(points: List[Dict], initial_route: List[int], max_iterat
         improved = False
         iteration += 1
 
-        for i in range(1, len(route) - 2):
-            for j in range(i + 1, len(route)):
-                if j - i == 1:
-                    continue
+        for i in range(1, n - 2):
+            prev_stop, first = route[i - 1], route[i]
+            if dont_look[prev_stop]:
+                continue
+
+            # Reversing route[i:j+1] swaps edges (i-1, i) and (j, j+1) for (i-1, j) and (i, j+1)
+            # Candidate ends j make (prev_stop, last) or (first, next_stop) a near-neighbor edge
+            j = np.concatenate((position[neighbors[prev_stop]], position[neighbors[first]] - 1))
+            j = j[j >= i + 2]
+            if j.size == 0:
+                dont_look[prev_stop] = True
+                continue
+
+            last, next_stop = route[j], route[(j + 1) % n]
+            delta = (
+                distances[prev_stop, last] + distances[first, next_stop]
+                - distances[prev_stop, first] - distances[last, next_stop]
+            )
 
-                # Calculate current distance
-                current_dist = (
-                    np.linalg.norm(coords[route[i]] - coords[route[i-1]]) +
-                    np.linalg.norm(coords[route[j]] - coords[route[(j+1) % len(route)]])
-                )
+            best = int(np.argmin(delta))
+            if delta[best] >= -1e-12:
+                dont_look[prev_stop] = True
+                continue
 
-                # Calculate new distance if we reverse the segment
-                new_dist = (
-                    np.linalg.norm(coords[route[j]] - coords[route[i-1]]) +
-                    np.linalg.norm(coords[route[i]] - coords[route[(j+1) % len(route)]])
-                )
+            # Reverse the segment. Every stop in it now leads into a different
+            # edge, so they get looked at again along with prev_stop
+            end = int(j[best])
+            route[i:end + 1] = route[i:end + 1][::-1]
+            position[route[i:end + 1]] = np.arange(i, end + 1)
+            dont_look[route[i - 1:end + 1]] = False
+            improved = True
+
+    return route.tolist()
+
+def compute_route(churches: List[Dict], start_idx: int,
+                  origin: Tuple[float, float] = None) -> Tuple[List[int], float]:
+    """
+    Build one planar distance matrix (projected around origin, default the
+    churches' centroid) for nearest neighbor and 2-opt, then measure the
+    final route with Haversine
+
+    Returns:
+        (route order as indices into churches, total distance in km)
+    """
+    coords = np.array([[c['latitude'], c['longitude']] for c in churches])
+    if origin is None:
+        origin = tuple(coords.mean(axis=0))
+    distances = planar_matrix(coords, origin)
 
-                if new_dist < current_dist:
-                    # Reverse the segment
-                    route[i:j+1] = reversed(route[i:j+1])
-                    improved = True
+    # Generate initial route using nearest neighbor
+    initial_route = nearest_neighbor_route(distances, start_idx)
 
-    return [initial_route[i] for i in route]
+    # Optimize using 2-opt
+    route = optimize_route_2opt(distances, initial_route)
+
+    stops = coords[route]
+    total_distance = float(haversine_vec(stops[:-1, 0], stops[:-1, 1], stops[1:, 0], stops[1:, 1]).sum())
+    return route, total_distance
+
+def compute_circle(circle: Tuple, churches: List[Dict]) -> Tuple[str, List[Dict], float]:
+    """
+    Route one circle's churches, starting from the church closest to its center
+
+    Returns:
+        (circle name, churches in visiting order, total distance in km)
+    """
+    circle_name, center_lat, center_lng = circle[:3]
+
+    # Find starting point (closest to circle center)
+    lats = np.array([c['latitude'] for c in churches])
+    lngs = np.array([c['longitude'] for c in churches])
+    start_idx = int(np.argmin(haversine_vec(lats, lngs, center_lat, center_lng)))
+
+    route_order, total_distance = compute_route(churches, start_idx, origin=(center_lat, center_lng))
+
+    # Create ordered list
+    return circle_name, [churches[i] for i in route_order], total_distance
 
 def main():
     print("=" * 80)
@@ -153,84 +393,98 @@ def main():
 
     # Read church data
     print("\n1. Reading church data...")
-    df = pd.read_excel('data/church_NJ.xlsx', sheet_name=0)
+    df = load_church_sheet('data/church_NJ.xlsx', f'{output_dir}/church_NJ.parquet')
     print(f"   Found {len(df)} churches")
 
     # Geocode addresses
     print("\n2. Geocoding addresses...")
-    progress_file = f'{output_dir}/geocoding_progress.json'
+    progress_db = open_progress_db(f'{output_dir}/geocoding_progress.sqlite',
+                                   f'{output_dir}/geocoding_progress.json')
 
     # Load existing progress if available
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r') as f:
-            progress = json.load(f)
+    progress = {
+        address: (lat, lng)
+        for address, lat, lng in progress_db.execute("SELECT address, lat, lng FROM geo")
+    }
+    if progress:
         print(f"   Resuming from existing progress ({len(progress)} already geocoded)")
-    else:
-        progress = {}
-
-    geocoded_churches = []
 
-    for idx, row in df.iterrows():
-        address = row['Address']
-
-        if pd.isna(address) or address == '':
-            print(f"   [{idx+1}/{len(df)}] Skipping - no address")
-            continue
-
-        # Check if already geocoded
-        if address in progress:
-            lat, lng = progress[address]
-        else:
-            print(f"   [{idx+1}/{len(df)}] Geocoding: {address}")
-            lat, lng = geocode_address(address)
-
-            if lat is not None and lng is not None:
-                progress[address] = [lat, lng]
-                # Save progress every 10 addresses
-                if idx % 10 == 0:
-                    with open(progress_file, 'w') as f:
-                        json.dump(progress, f, indent=2)
-
-            # Rate limiting
-            time.sleep(0.2)
-
-        if lat is not None and lng is not None:
-            geocoded_churches.append({
-                'name': row['Names'],
-                'address': address,
-                'type': row['Type'],
-                'latitude': lat,
-                'longitude': lng,
-                'phone': row.get('Phone Number', ''),
-                'website': row.get('Website', ''),
-                'opens_at': row.get('Opens At', ''),
-                'review_count': row.get('Review Count', 0),
-                'avg_review': row.get('Average Review Count', 0),
-            })
-
-    # Save final progress
-    with open(progress_file, 'w') as f:
-        json.dump(progress, f, indent=2)
+    # Geocode every new address concurrently; requests overlap their network
+    # latency while _throttle() keeps the overall request rate down
+    pending = list(dict.fromkeys(
+        address for address in df['Address']
+        if not (pd.isna(address) or address == '') and address not in progress
+    ))
+
+    if pending:
+        print(f"   Geocoding {len(pending)} new addresses ({GEOCODE_WORKERS} concurrent requests)...")
+        with ThreadPoolExecutor(max_workers=GEOCODE_WORKERS) as executor:
+            futures = {executor.submit(geocode_address, address): address for address in pending}
+
+            for done, future in enumerate(as_completed(futures), 1):
+                address = futures[future]
+                lat, lng = future.result()
+                print(f"   [{done}/{len(pending)}] Geocoded: {address}")
+
+                if lat is not None and lng is not None:
+                    progress[address] = (lat, lng)
+                    progress_db.execute("INSERT OR REPLACE INTO geo VALUES (?, ?, ?)",
+                                        (address, lat, lng))
+
+                # Commit progress every 50 addresses
+                if done % 50 == 0:
+                    progress_db.commit()
+
+    progress_db.commit()
+    progress_db.close()
+
+    # Attach coordinates to every church in one pass (churches sharing an
+    # address reuse the same geocode)
+    has_address = df['Address'].notna() & (df['Address'] != '')
+    if not has_address.all():
+        print(f"   Skipping {int((~has_address).sum())} churches with no address")
+
+    located = df[has_address]
+    # Addresses that never geocoded map to NaN (all of them, when none did)
+    coords = located['Address'].map(progress)
+    located = located.assign(latitude=coords.map(lambda c: c[0], na_action='ignore'),
+                             longitude=coords.map(lambda c: c[1], na_action='ignore'))
+    located = located.dropna(subset=['latitude', 'longitude'])
+
+    geocoded_churches = pd.DataFrame({
+        'name': located['Names'],
+        'address': located['Address'],
+        'type': located['Type'],
+        'latitude': located['latitude'],
+        'longitude': located['longitude'],
+        'phone': located.get('Phone Number', ''),
+        'website': located.get('Website', ''),
+        'opens_at': located.get('Opens At', ''),
+        'review_count': located.get('Review Count', 0),
+        'avg_review': located.get('Average Review Count', 0),
+    }).to_dict('records')
 
     print(f"\n   Successfully geocoded {len(geocoded_churches)} churches")
 
     # Assign churches to circles
     print("\n3. Assigning churches to circles...")
 
-    circle_assignments = {circle[0]: [] for circle in CIRCLES}
-    unassigned = []
+    # One (churches x circles) distance matrix; each church goes to the first circle containing it
+    church_coords = np.array([[c['latitude'], c['longitude']] for c in geocoded_churches]).reshape(-1, 2)
+    circle_lat = np.array([circle[1] for circle in CIRCLES])
+    circle_lng = np.array([circle[2] for circle in CIRCLES])
+    circle_radius = np.array([circle[3] for circle in CIRCLES])
 
-    for church in geocoded_churches:
-        assigned = False
-        for circle_name, center_lat, center_lng, radius_km, description in CIRCLES:
-            if point_in_circle(church['latitude'], church['longitude'],
-                              center_lat, center_lng, radius_km):
-                circle_assignments[circle_name].append(church)
-                assigned = True
-                break
+    inside = haversine_vec(church_coords[:, 0:1], church_coords[:, 1:2],
+                           circle_lat[None, :], circle_lng[None, :]) <= circle_radius[None, :]
+    first_circle = np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
 
-        if not assigned:
-            unassigned.append(church)
+    # Pull each circle's members out by index instead of appending church by church
+    circle_assignments = {
+        circle[0]: [geocoded_churches[i] for i in np.flatnonzero(first_circle == circle_idx)]
+        for circle_idx, circle in enumerate(CIRCLES)
+    }
+    unassigned = [geocoded_churches[i] for i in np.flatnonzero(first_circle < 0)]
 
     print("\n   Circle assignments:")
     for circle_name in circle_assignments:
@@ -243,54 +497,34 @@ def main():
 
     all_routes = []
 
-    for circle_name, center_lat, center_lng, radius_km, description in CIRCLES:
-        churches = circle_assignments[circle_name]
-
-        if len(churches) == 0:
+    for circle_name, *_ in CIRCLES:
+        if len(circle_assignments[circle_name]) == 0:
             print(f"\n   {circle_name}: No churches to route")
-            continue
 
-        print(f"\n   {circle_name}: {len(churches)} churches")
-        print(f"   Description: {description}")
+    # Each process only receives its own circle's small list of church dicts
+    work = [circle for circle in CIRCLES if circle_assignments[circle[0]]]
+    descriptions = {circle[0]: circle[4] for circle in CIRCLES}
 
-        if len(churches) == 1:
-            route_order = [0]
-        else:
-            # Find starting point (closest to circle center)
-            start_idx = min(range(len(churches)),
-                          key=lambda i: calculate_distance(
-                              churches[i]['latitude'], churches[i]['longitude'],
-                              center_lat, center_lng))
-
-            # Generate initial route using nearest neighbor
-            initial_route = nearest_neighbor_route(churches, start_idx)
-
-            # Optimize using 2-opt
-            route_order = optimize_route_2opt(churches, initial_route)
-
-        # Create ordered list
-        ordered_churches = [churches[i] for i in route_order]
-
-        # Calculate total distance
-        total_distance = 0
-        for i in range(len(ordered_churches) - 1):
-            dist = calculate_distance(
-                ordered_churches[i]['latitude'],
-                ordered_churches[i]['longitude'],
-                ordered_churches[i+1]['latitude'],
-                ordered_churches[i+1]['longitude']
-            )
-            total_distance += dist
+    workers = min(ROUTE_WORKERS, len(work))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()
+    with pool as executor:
+        route = executor.map if executor else map
+        results = route(compute_circle, work, [circle_assignments[circle[0]] for circle in work])
 
-        print(f"   Route optimized: {len(ordered_churches)} stops, {total_distance:.2f} km total")
+        for circle_name, ordered_churches, total_distance in results:
+            description = descriptions[circle_name]
 
-        # Add to all routes with sequence numbers
-        for seq, church in enumerate(ordered_churches, 1):
-            route_record = church.copy()
-            route_record['circle'] = circle_name
-            route_record['sequence'] = seq
-            route_record['circle_description'] = description
-            all_routes.append(route_record)
+            print(f"\n   {circle_name}: {len(ordered_churches)} churches")
+            print(f"   Description: {description}")
+            print(f"   Route optimized: {len(ordered_churches)} stops, {total_distance:.2f} km total")
+
+            # Add to all routes with sequence numbers
+            for seq, church in enumerate(ordered_churches, 1):
+                route_record = church.copy()
+                route_record['circle'] = circle_name
+                route_record['sequence'] = seq
+                route_record['circle_description'] = description
+                all_routes.append(route_record)
 
     # Save routes to CSV
     print("\n5. Exporting routes...")
@@ -301,9 +535,8 @@ def main():
     print(f"   ✓ Saved to {output_csv}")
 
     # Create separate CSV for each circle
-    for circle_name in circle_assignments:
-        circle_routes = routes_df[routes_df['circle'] == circle_name]
-        if len(circle_routes) > 0:
+    if len(routes_df) > 0:
+        for circle_name, circle_routes in routes_df.groupby('circle', sort=False):
             circle_csv = f'{output_dir}/{circle_name}_route.csv'
             circle_routes.to_csv(circle_csv, index=False)
             print(f"   ✓ Saved {circle_name} to {circle_csv}")
@@ -3,76 +3,122 @@
 Export church routes to KMZ files for Google Earth/Maps visualization
 """
 
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
 import pandas as pd
-import simplekml
 import os
 from pathlib import Path
 
-# Color scheme for different circles
+# Color scheme for different circles (KML aabbggrr)
 CIRCLE_COLORS = {
-    'Circle1_Northwest_Bergen': simplekml.Color.red,
-    'Circle2_North_Woodbridge': simplekml.Color.blue,
-    'Circle3_Northeast_Palisades': simplekml.Color.green,
-    'Circle4_East_Edgewater': simplekml.Color.yellow,
-    'Circle5_South_Union_City': simplekml.Color.orange,
-    'Circle6_Southwest_Newark': simplekml.Color.purple,
-    'Circle7_Southeast_Secaucus': simplekml.Color.cyan,
+    'Circle1_Northwest_Bergen': 'ff0000ff',     # Red
+    'Circle2_North_Woodbridge': 'ffff0000',     # Blue
+    'Circle3_Northeast_Palisades': 'ff008000',  # Green
+    'Circle4_East_Edgewater': 'ff00ffff',       # Yellow
+    'Circle5_South_Union_City': 'ff00a5ff',     # Orange
+    'Circle6_Southwest_Newark': 'ff800080',     # Purple
+    'Circle7_Southeast_Secaucus': 'ffffff00',   # Cyan
 }
+DEFAULT_COLOR = 'ffffffff'  # White
+
+# KML is written as plain text templates instead of a per-Placemark object tree
+KML_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n<kml xmlns=\"http://www.opengis.net/kml/2.2\"><Document>\n"
+KML_FOOTER = "</Document></kml>\n"
+STYLE_TEMPLATE = (
+    '<Style id="{style_id}-route"><LineStyle><color>{color}</color><width>3</width></LineStyle></Style>\n'
+    '<Style id="{style_id}-stop"><IconStyle><color>{color}</color><scale>{icon_scale}</scale>'
+    '<Icon><href>http://maps.google.com/mapfiles/kml/pushpin/ylw-pushpin.png</href></Icon>'
+    '</IconStyle>{label_style}</Style>\n'
+)
+ROUTE_TEMPLATE = (
+    '<Placemark><name>{name}</name><styleUrl>#{style_id}-route</styleUrl>'
+    '<LineString><coordinates>{coordinates}</coordinates></LineString></Placemark>\n'
+)
+STOP_TEMPLATE = (
+    '<Placemark><name>{title}</name><styleUrl>#{style_id}-stop</styleUrl>'
+    '<description><![CDATA[{circle_line}'
+    '<b>Stop #{seq}</b><br/>'
+    '<b>Name:</b> {name}<br/>'
+    '<b>Type:</b> {type}<br/>'
+    '<b>Address:</b> {address}<br/>'
+    '<b>Phone:</b> {phone}<br/>'
+    '<b>Website:</b> {website}<br/>'
+    '<b>Opens:</b> {opens_at}<br/>'
+    '<b>Reviews:</b> {review_count} ({avg_review} stars)<br/>'
+    '<br/>'
+    '<a href="https://www.google.com/maps/dir/?api=1&destination={latitude},{longitude}" target="_blank">Get Directions</a>'
+    ']]></description>'
+    '<Point><coordinates>{longitude},{latitude},0</coordinates></Point></Placemark>\n'
+)
+
+# Plain-text driving directions
+SEP = '=' * 80
+DIRECTIONS_STOP_TEMPLATE = (
+    "STOP {seq}: {name}\n"
+    f"{'-' * 60}\n"
+    "Address:    {address}\n"
+    "Type:       {type}\n"
+    "Phone:      {phone}\n"
+    "Website:    {website}\n"
+    "Opens:      {opens_at}\n"
+    "Reviews:    {review_count} reviews ({avg_review} stars)\n"
+    "GPS:        {latitude}, {longitude}\n"
+    "Google Map: https://www.google.com/maps/dir/?api=1&destination={latitude},{longitude}\n"
+    "\n"
+)
+
+def render_circle_folder(circle_name: str, df: pd.DataFrame, title_prefix: str,
+                         title_sep: str, circle_line: str = '') -> str:
+    """Render one circle's route line and numbered markers as a KML <Folder>"""
+
+    parts = [f"<Folder><name>{escape(circle_name.replace('_', ' '))}</name>\n"]
+
+    # Add route line
+    if len(df) > 1:
+        coordinates = (df['longitude'].astype(str) + ',' + df['latitude'].astype(str) + ',0').str.cat(sep=' ')
+        parts.append(ROUTE_TEMPLATE.format(
+            name=escape(f"{circle_name} Route"), style_id=circle_name, coordinates=coordinates
+        ))
+
+    # Add numbered markers, with the per-row text columns built up front
+    seq = df['sequence'].astype(int).astype(str)
+    stops = df.assign(
+        seq=seq,
+        title=title_prefix + seq + title_sep + df['name'].astype(str).map(escape),
+        style_id=circle_name,
+        circle_line=circle_line
+    )
+    parts.extend(STOP_TEMPLATE.format_map(row) for row in stops.to_dict('records'))
+
+    parts.append('</Folder>\n')
+    return ''.join(parts)
+
+def write_kmz(output_file: str, kml: str):
+    """Write a KML document as doc.kml inside a KMZ archive"""
+    with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as kmz:
+        kmz.writestr('doc.kml', kml)
 
 def create_kmz_for_circle(circle_name: str, df: pd.DataFrame, output_dir: str):
     """Create a KMZ file for a specific circle with numbered markers and route lines"""
 
-    kml = simplekml.Kml()
+    out = io.StringIO()
+    out.write(KML_HEADER)
 
-    # Create folder for this circle
-    folder = kml.newfolder(name=circle_name.replace('_', ' '))
+    # Styles live at Document level and are shared through styleUrl
+    color = CIRCLE_COLORS.get(circle_name, DEFAULT_COLOR)
+    out.write(STYLE_TEMPLATE.format(
+        style_id=circle_name, color=color, icon_scale='1.2',
+        label_style='<LabelStyle><scale>1.0</scale></LabelStyle>'
+    ))
 
-    # Get color for this circle
-    color = CIRCLE_COLORS.get(circle_name, simplekml.Color.white)
-
-    # Add route line
-    line_coords = []
-    for _, row in df.iterrows():
-        line_coords.append((row['longitude'], row['latitude']))
-
-    if len(line_coords) > 1:
-        linestring = folder.newlinestring(name=f"{circle_name} Route")
-        linestring.coords = line_coords
-        linestring.style.linestyle.color = color
-        linestring.style.linestyle.width = 3
-
-    # Add numbered markers
-    for idx, row in df.iterrows():
-        point = folder.newpoint(
-            name=f"{int(row['sequence'])}. {row['name']}",
-            coords=[(row['longitude'], row['latitude'])]
-        )
-
-        # Create description
-        description = f"""
-        <![CDATA[
-        <b>Stop #{int(row['sequence'])}</b><br/>
-        <b>Name:</b> {row['name']}<br/>
-        <b>Type:</b> {row['type']}<br/>
-        <b>Address:</b> {row['address']}<br/>
-        <b>Phone:</b> {row['phone']}<br/>
-        <b>Website:</b> {row['website']}<br/>
-        <b>Opens:</b> {row['opens_at']}<br/>
-        <b>Reviews:</b> {row['review_count']} ({row['avg_review']} stars)<br/>
-        <br/>
-        <a href="https://www.google.com/maps/dir/?api=1&destination={row['latitude']},{row['longitude']}" target="_blank">Get Directions</a>
-        ]]>
-        """
-        point.description = description
-
-        # Style the marker
-        point.style.iconstyle.color = color
-        point.style.iconstyle.scale = 1.2
-        point.style.labelstyle.scale = 1.0
+    out.write(render_circle_folder(circle_name, df, title_prefix='', title_sep='. '))
+    out.write(KML_FOOTER)
 
     # Save as KMZ
     output_file = f'{output_dir}/{circle_name}.kmz'
-    kml.savekmz(output_file)
+    write_kmz(output_file, out.getvalue())
     print(f"   ✓ Created {output_file}")
 
     return output_file
@@ -80,59 +126,29 @@ def create_kmz_for_circle(circle_name: str, df: pd.DataFrame, output_dir: str):
 def create_combined_kmz(routes_df: pd.DataFrame, output_dir: str):
     """Create a single KMZ with all routes"""
 
-    kml = simplekml.Kml(name="NJ Churches - All Routes")
+    circle_names = routes_df['circle'].unique()
+
+    out = io.StringIO()
+    out.write(KML_HEADER)
+    out.write(f"<name>{escape('NJ Churches - All Routes')}</name>\n")
+
+    for circle_name in circle_names:
+        color = CIRCLE_COLORS.get(circle_name, DEFAULT_COLOR)
+        out.write(STYLE_TEMPLATE.format(style_id=circle_name, color=color, icon_scale='1.0', label_style=''))
 
     # Group by circle
-    for circle_name in routes_df['circle'].unique():
+    for circle_name in circle_names:
         circle_df = routes_df[routes_df['circle'] == circle_name].sort_values('sequence')
+        out.write(render_circle_folder(
+            circle_name, circle_df, title_prefix=f"{circle_name} #", title_sep=': ',
+            circle_line=f"<b>Circle:</b> {circle_name.replace('_', ' ')}<br/>"
+        ))
 
-        # Create folder for this circle
-        folder = kml.newfolder(name=circle_name.replace('_', ' '))
-
-        # Get color
-        color = CIRCLE_COLORS.get(circle_name, simplekml.Color.white)
-
-        # Add route line
-        line_coords = []
-        for _, row in circle_df.iterrows():
-            line_coords.append((row['longitude'], row['latitude']))
-
-        if len(line_coords) > 1:
-            linestring = folder.newlinestring(name=f"{circle_name} Route")
-            linestring.coords = line_coords
-            linestring.style.linestyle.color = color
-            linestring.style.linestyle.width = 3
-
-        # Add numbered markers
-        for idx, row in circle_df.iterrows():
-            point = folder.newpoint(
-                name=f"{circle_name} #{int(row['sequence'])}: {row['name']}",
-                coords=[(row['longitude'], row['latitude'])]
-            )
-
-            description = f"""
-            <![CDATA[
-            <b>Circle:</b> {circle_name.replace('_', ' ')}<br/>
-            <b>Stop #{int(row['sequence'])}</b><br/>
-            <b>Name:</b> {row['name']}<br/>
-            <b>Type:</b> {row['type']}<br/>
-            <b>Address:</b> {row['address']}<br/>
-            <b>Phone:</b> {row['phone']}<br/>
-            <b>Website:</b> {row['website']}<br/>
-            <b>Opens:</b> {row['opens_at']}<br/>
-            <b>Reviews:</b> {row['review_count']} ({row['avg_review']} stars)<br/>
-            <br/>
-            <a href="https://www.google.com/maps/dir/?api=1&destination={row['latitude']},{row['longitude']}" target="_blank">Get Directions</a>
-            ]]>
-            """
-            point.description = description
-
-            point.style.iconstyle.color = color
-            point.style.iconstyle.scale = 1.0
+    out.write(KML_FOOTER)
 
     # Save combined KMZ
     output_file = f'{output_dir}/all_churches_routes.kmz'
-    kml.savekmz(output_file)
+    write_kmz(output_file, out.getvalue())
     print(f"   ✓ Created combined KMZ: {output_file}")
 
     return output_file
@@ -142,58 +158,45 @@ def create_driving_directions(circle_name: str, df: pd.DataFrame, output_dir: st
 
     output_file = f'{output_dir}/{circle_name}_directions.txt'
 
-    with open(output_file, 'w') as f:
-        f.write(f"{'='*80}\n")
-        f.write(f"DRIVING ROUTE: {circle_name.replace('_', ' ')}\n")
-        f.write(f"{'='*80}\n\n")
-
-        f.write(f"Total Stops: {len(df)}\n")
-        f.write(f"Description: {df.iloc[0]['circle_description']}\n\n")
-
-        f.write(f"{'='*80}\n")
-        f.write(f"ROUTE SEQUENCE\n")
-        f.write(f"{'='*80}\n\n")
-
-        for idx, row in df.iterrows():
-            seq = int(row['sequence'])
-            f.write(f"STOP {seq}: {row['name']}\n")
-            f.write(f"{'-'*60}\n")
-            f.write(f"Address:    {row['address']}\n")
-            f.write(f"Type:       {row['type']}\n")
-            f.write(f"Phone:      {row['phone']}\n")
-            f.write(f"Website:    {row['website']}\n")
-            f.write(f"Opens:      {row['opens_at']}\n")
-            f.write(f"Reviews:    {row['review_count']} reviews ({row['avg_review']} stars)\n")
-            f.write(f"GPS:        {row['latitude']}, {row['longitude']}\n")
-            f.write(f"Google Map: https://www.google.com/maps/dir/?api=1&destination={row['latitude']},{row['longitude']}\n")
-            f.write(f"\n")
-
-        # Add Google Maps multi-stop route URL
-        f.write(f"\n{'='*80}\n")
-        f.write(f"GOOGLE MAPS ROUTE (Multi-Stop)\n")
-        f.write(f"{'='*80}\n\n")
-
-        # Create waypoints for first 9 stops (Google Maps limit)
-        waypoints = []
-        for idx, row in df.head(10).iterrows():
-            waypoints.append(f"{row['latitude']},{row['longitude']}")
-
-        if len(waypoints) > 1:
-            origin = waypoints[0]
-            destination = waypoints[-1]
-            middle_waypoints = '|'.join(waypoints[1:-1]) if len(waypoints) > 2 else ''
-
-            if middle_waypoints:
-                maps_url = f"https://www.google.com/maps/dir/?api=1&origin={origin}&destination={destination}&waypoints={middle_waypoints}&travelmode=driving"
-            else:
-                maps_url = f"https://www.google.com/maps/dir/?api=1&origin={origin}&destination={destination}&travelmode=driving"
-
-            f.write(f"First 10 stops:\n{maps_url}\n\n")
-
-            if len(df) > 10:
-                f.write(f"Note: Google Maps limits to 10 stops per route.\n")
-                f.write(f"This route has {len(df)} stops total.\n")
-                f.write(f"Break it into multiple segments or use the KMZ file.\n\n")
+    parts = [
+        f"{SEP}\n",
+        f"DRIVING ROUTE: {circle_name.replace('_', ' ')}\n",
+        f"{SEP}\n\n",
+        f"Total Stops: {len(df)}\n",
+        f"Description: {df.iloc[0]['circle_description']}\n\n",
+        f"{SEP}\n",
+        "ROUTE SEQUENCE\n",
+        f"{SEP}\n\n",
+    ]
+
+    stops = df.assign(seq=df['sequence'].astype(int))
+    parts.extend(DIRECTIONS_STOP_TEMPLATE.format_map(row) for row in stops.to_dict('records'))
+
+    # Add Google Maps multi-stop route URL
+    parts.append(f"\n{SEP}\nGOOGLE MAPS ROUTE (Multi-Stop)\n{SEP}\n\n")
+
+    # Create waypoints for first 9 stops (Google Maps limit)
+    first_stops = df.head(10)
+    waypoints = (first_stops['latitude'].astype(str) + ',' + first_stops['longitude'].astype(str)).tolist()
+
+    if len(waypoints) > 1:
+        origin = waypoints[0]
+        destination = waypoints[-1]
+        middle_waypoints = '|'.join(waypoints[1:-1]) if len(waypoints) > 2 else ''
+
+        if middle_waypoints:
+            maps_url = f"https://www.google.com/maps/dir/?api=1&origin={origin}&destination={destination}&waypoints={middle_waypoints}&travelmode=driving"
+        else:
+            maps_url = f"https://www.google.com/maps/dir/?api=1&origin={origin}&destination={destination}&travelmode=driving"
+
+        parts.append(f"First 10 stops:\n{maps_url}\n\n")
+
+        if len(df) > 10:
+            parts.append("Note: Google Maps limits to 10 stops per route.\n")
+            parts.append(f"This route has {len(df)} stops total.\n")
+            parts.append("Break it into multiple segments or use the KMZ file.\n\n")
+
+    Path(output_file).write_text(''.join(parts))
 
     print(f"   ✓ Created directions: {output_file}")
     return output_file
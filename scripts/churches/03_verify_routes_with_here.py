@@ -3,134 +3,99 @@
 Verify and optimize church routes using HERE Routing API for actual road distances
 """
 
-import pandas as pd
-import requests
-import time
-import json
 import os
-from typing import List, Tuple, Dict, Optional
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
 import numpy as np
-from scipy.spatial.distance import cdist
+import pandas as pd
 
-# HERE API key
-HERE_API_KEY = os.environ.get('HERE_API_KEY', '0zt1IVbSQt3cPrM8_jaLXyFoq9TALX4OPXWfIsxGg1s')
+from utils.here import (
+    cache_get, cache_set, get_driving_routes, get_route_matrix, haversine_vec,
+    matrix_cache_key, write_route
+)
 
-def get_driving_route(origin_lat: float, origin_lng: float,
-                      dest_lat: float, dest_lng: float) -> Optional[Dict]:
-    """
-    Get driving route between two points using HERE Routing API
-    Returns distance (meters), time (seconds), and route geometry
-    """
-    try:
-        url = "https://router.hereapi.com/v8/routes"
-
-        params = {
-            'apiKey': HERE_API_KEY,
-            'transportMode': 'car',
-            'origin': f'{origin_lat},{origin_lng}',
-            'destination': f'{dest_lat},{dest_lng}',
-            'return': 'summary,polyline'
-        }
-
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-
-        data = response.json()
-
-        if 'routes' in data and len(data['routes']) > 0:
-            route = data['routes'][0]
-            section = route['sections'][0]
-
-            return {
-                'distance_meters': section['summary']['length'],
-                'distance_km': section['summary']['length'] / 1000,
-                'duration_seconds': section['summary']['duration'],
-                'duration_minutes': section['summary']['duration'] / 60,
-                'polyline': section.get('polyline', '')
-            }
-        else:
-            print(f"  Warning: No route found")
-            return None
+# Try to import numba to JIT-compile the 2-opt kernel
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
-    except Exception as e:
-        print(f"  Error getting route: {e}")
-        return None
+# 2-opt only tries reconnecting each stop to this many of its nearest stops
+TWO_OPT_NEIGHBORS = 20
 
-def calculate_route_matrix(churches: List[Dict], cache_file: str) -> np.ndarray:
+# Circles up to this many stops are solved exactly with Held-Karp, which is
+# O(n^2 * 2^n); without numba the DP is only fast enough for smaller ones
+HELD_KARP_MAX_STOPS = 18 if NUMBA_AVAILABLE else 12
+
+def symmetrize(matrix: np.ndarray) -> np.ndarray:
+    """Mirror the upper triangle of a square matrix onto the lower one"""
+    return np.triu(matrix) + np.triu(matrix, 1).T
+
+def calculate_route_matrix(lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Calculate distance matrix using actual driving distances
     Uses caching to avoid repeated API calls
+
+    The whole matrix comes from one HERE Matrix API request and is stored in
+    the shared HERE cache under a hash of the sorted church coordinates, so
+    a reordered route reuses it.
+
+    Returns:
+        (directed distances in km, directed travel times in minutes, and a
+        symmetric copy of the distances for route optimization, where each
+        pair uses one driving distance for both directions - taken from the
+        upper triangle in sorted order - as 2-opt's segment reversals assume);
+        travel times are NaN where HERE could not route the pair
     """
-    n = len(churches)
+    n = len(lat)
 
-    # Load cache if exists
-    if os.path.exists(cache_file):
-        print(f"  Loading cached route matrix from {cache_file}")
-        with open(cache_file, 'r') as f:
-            cache = json.load(f)
-    else:
-        cache = {}
+    # Matrices are stored in sorted-coordinate order; rank maps churches into it
+    key, order, rank = matrix_cache_key(lat, lng)
 
-    # Initialize distance matrix
-    distance_matrix = np.zeros((n, n))
+    cached = cache_get(key)
+    if cached:
+        sorted_matrix = np.array(cached['distances_km'])
+        travel_times = np.array(cached['travel_times_min'], dtype=float)
+        print(f"  Complete: 0 new API calls, 1 cache hit")
+    else:
+        sorted_lat, sorted_lng = lat[order], lng[order]
+        matrix = get_route_matrix(sorted_lat, sorted_lng)
+
+        # Straight-line distances for every pair at once, used where HERE could not route
+        sorted_matrix = haversine_vec(sorted_lat[:, None], sorted_lng[:, None],
+                                      sorted_lat[None, :], sorted_lng[None, :])
+
+        if matrix:
+            failed = np.asarray(matrix.get('errorCodes') or np.zeros(n * n), dtype=int).reshape(n, n) != 0
+            routed = np.asarray(matrix['distances'], dtype=float).reshape(n, n) / 1000.0
+            sorted_matrix = np.where(failed, sorted_matrix, routed)
+            travel_times = np.asarray(matrix['travelTimes'], dtype=float).reshape(n, n) / 60.0
+            travel_times = np.where(failed, np.nan, travel_times)
+        else:
+            failed = ~np.eye(n, dtype=bool)
+            travel_times = np.where(failed, np.nan, 0.0)
 
-    total_calls = 0
-    cache_hits = 0
+        if failed.any():
+            print(f"  Warning: Using straight-line distance for {int(failed.sum())} routes")
 
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                distance_matrix[i][j] = 0
-                continue
+        # Only cache matrices that came back from HERE
+        if matrix:
+            cache_set(key, {
+                'distances_km': sorted_matrix.tolist(),
+                'travel_times_min': travel_times.tolist()
+            })
 
-            # Create cache key
-            key = f"{churches[i]['latitude']:.6f},{churches[i]['longitude']:.6f}_to_{churches[j]['latitude']:.6f},{churches[j]['longitude']:.6f}"
+        print(f"  Complete: 1 new API call, 0 cache hits")
 
-            if key in cache:
-                distance_matrix[i][j] = cache[key]
-                cache_hits += 1
-            else:
-                # Get actual driving distance
-                route = get_driving_route(
-                    churches[i]['latitude'], churches[i]['longitude'],
-                    churches[j]['latitude'], churches[j]['longitude']
-                )
-
-                if route:
-                    distance_km = route['distance_km']
-                    distance_matrix[i][j] = distance_km
-                    cache[key] = distance_km
-                else:
-                    # Fallback to straight-line distance if routing fails
-                    from math import radians, sin, cos, sqrt, atan2
-                    R = 6371
-                    lat1, lng1 = radians(churches[i]['latitude']), radians(churches[i]['longitude'])
-                    lat2, lng2 = radians(churches[j]['latitude']), radians(churches[j]['longitude'])
-                    dlat, dlng = lat2 - lat1, lng2 - lng1
-                    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-                    distance_km = R * 2 * atan2(sqrt(a), sqrt(1-a))
-                    distance_matrix[i][j] = distance_km
-                    cache[key] = distance_km
-                    print(f"  Warning: Using straight-line distance for route {i}->{j}")
-
-                total_calls += 1
-
-                # Rate limiting
-                time.sleep(0.1)
-
-                # Save cache periodically
-                if total_calls % 50 == 0:
-                    with open(cache_file, 'w') as f:
-                        json.dump(cache, f)
-                    print(f"  Progress: {total_calls} API calls, {cache_hits} cache hits")
-
-    # Save final cache
-    with open(cache_file, 'w') as f:
-        json.dump(cache, f)
-
-    print(f"  Complete: {total_calls} new API calls, {cache_hits} cache hits")
-
-    return distance_matrix
+    to_route_order = np.ix_(rank, rank)
+    return (sorted_matrix[to_route_order], travel_times[to_route_order],
+            symmetrize(sorted_matrix)[to_route_order])
 
 def nearest_neighbor_route_with_matrix(distance_matrix: np.ndarray,
                                        start_idx: int = 0) -> List[int]:
@@ -142,30 +107,143 @@ def nearest_neighbor_route_with_matrix(distance_matrix: np.ndarray,
     if n <= 1:
         return list(range(n))
 
-    unvisited = set(range(n))
+    visited = np.zeros(n, dtype=bool)
+    visited[start_idx] = True
     route = [start_idx]
-    unvisited.remove(start_idx)
 
     current = start_idx
-    while unvisited:
+    for _ in range(n - 1):
         # Find nearest unvisited
-        nearest = min(unvisited, key=lambda x: distance_matrix[current][x])
-        route.append(nearest)
-        unvisited.remove(nearest)
-        current = nearest
+        row = distance_matrix[current].copy()
+        row[visited] = np.inf
+        current = int(np.argmin(row))
+        visited[current] = True
+        route.append(current)
 
     return route
 
+def _two_opt_kernel(distance_matrix: np.ndarray, route: np.ndarray, neighbors: np.ndarray,
+                    max_iterations: int) -> np.ndarray:
+    """
+    Scalar-loop 2-opt, JIT-compiled with numba when it is installed
+
+    Makes the same first-improvement moves as optimize_route_2opt_with_matrix,
+    reversing segments in place with two pointers.
+    """
+    n = route.shape[0]
+    position = np.empty(n, dtype=np.int64)
+    for idx in range(n):
+        position[route[idx]] = idx
+
+    improved = True
+    iteration = 0
+
+    while improved and iteration < max_iterations:
+        improved = False
+        iteration += 1
+
+        for p in range(1, n):
+            prev_stop = route[p - 1]
+            stop = route[p]
+            current_edge = distance_matrix[prev_stop, stop]
+            lo = -1
+            hi = -1
+
+            # Reverse route[p..j] so prev_stop links to a near neighbor
+            for k in range(neighbors.shape[1]):
+                candidate = neighbors[prev_stop, k]
+                new_edge = distance_matrix[prev_stop, candidate]
+                if new_edge >= current_edge:
+                    break
+                j = position[candidate]
+                if j <= p:
+                    continue
+                current_dist = current_edge
+                new_dist = new_edge
+                # The route is open: reversing its tail only swaps one edge
+                if j + 1 < n:
+                    current_dist += distance_matrix[candidate, route[j + 1]]
+                    new_dist += distance_matrix[stop, route[j + 1]]
+                if new_dist < current_dist:
+                    lo = p
+                    hi = j
+                    break
+
+            # Or reverse route[i..p-1] so stop links to a near neighbor
+            if lo < 0:
+                for k in range(neighbors.shape[1]):
+                    candidate = neighbors[stop, k]
+                    new_edge = distance_matrix[stop, candidate]
+                    if new_edge >= current_edge:
+                        break
+                    i = position[candidate]
+                    if i < 1 or i >= p - 1:
+                        continue
+                    before = route[i - 1]
+                    current_dist = current_edge + distance_matrix[before, candidate]
+                    new_dist = new_edge + distance_matrix[before, prev_stop]
+                    if new_dist < current_dist:
+                        lo = i
+                        hi = p - 1
+                        break
+
+            if lo >= 0:
+                # Reverse segment
+                while lo < hi:
+                    route[lo], route[hi] = route[hi], route[lo]
+                    position[route[lo]] = lo
+                    position[route[hi]] = hi
+                    lo += 1
+                    hi -= 1
+                improved = True
+
+    return route
+
+if NUMBA_AVAILABLE:
+    _two_opt_kernel = njit(cache=True)(_two_opt_kernel)
+
+def nearest_neighbors(distance_matrix: np.ndarray, k: int) -> np.ndarray:
+    """Indices of each stop's k closest other stops, nearest first"""
+    distances = distance_matrix.copy()
+    np.fill_diagonal(distances, np.inf)
+    return np.ascontiguousarray(np.argsort(distances, axis=1, kind='stable')[:, :k], dtype=np.int64)
+
+def route_length(distance_matrix: np.ndarray, route: List[int]) -> float:
+    """Total distance of visiting stops in route order (no return to the start)"""
+    stops = np.asarray(route)
+    return float(distance_matrix[stops[:-1], stops[1:]].sum())
+
 def optimize_route_2opt_with_matrix(distance_matrix: np.ndarray,
                                     initial_route: List[int],
                                     max_iterations: int = 1000) -> List[int]:
     """
     Improve route using 2-opt with pre-computed distance matrix
+    Runs the compiled _two_opt_kernel when numba is installed
+
+    An improving move always makes one stop next to a removed edge link to
+    something closer, so for each edge only reversals that connect one of its
+    ends to one of its TWO_OPT_NEIGHBORS nearest stops are tried, and only
+    while that new edge is shorter than the removed one.
     """
     if len(initial_route) <= 3:
         return initial_route
 
-    route = initial_route.copy()
+    neighbors = nearest_neighbors(distance_matrix, min(TWO_OPT_NEIGHBORS, len(initial_route) - 1))
+
+    if NUMBA_AVAILABLE:
+        route = np.array(initial_route, dtype=np.int64)
+        distances = np.ascontiguousarray(distance_matrix, dtype=np.float64)
+        return _two_opt_kernel(distances, route, neighbors, max_iterations).tolist()
+
+    # Nested lists of Python floats index much faster than NumPy scalars,
+    # and every lookup below goes through a local name
+    dm = distance_matrix.tolist()
+    candidates = neighbors.tolist()
+    route = list(initial_route)
+    n = len(route)
+    position = [0] * len(dm)
+    for idx, stop in enumerate(route):
+        position[stop] = idx
     improved = True
     iteration = 0
 
@@ -173,71 +251,162 @@ def optimize_route_2opt_with_matrix(distance_matrix: np.ndarray,
         improved = False
         iteration += 1
 
-        for i in range(1, len(route) - 2):
-            for j in range(i + 1, len(route)):
-                if j - i == 1:
+        for p in range(1, n):
+            prev_stop, stop = route[p-1], route[p]
+            prev_row, stop_row = dm[prev_stop], dm[stop]
+            current_edge = prev_row[stop]
+            segment = None
+
+            # Reverse route[p..j] so prev_stop links to a near neighbor
+            for candidate in candidates[prev_stop]:
+                new_edge = prev_row[candidate]
+                if new_edge >= current_edge:
+                    break
+                j = position[candidate]
+                if j <= p:
                     continue
+                # Only the edges around the reversed segment change; the route
+                # is open, so reversing its tail swaps just the one before it
+                current_dist = current_edge
+                new_dist = new_edge
+                if j + 1 < n:
+                    after = route[j+1]
+                    current_dist += dm[candidate][after]
+                    new_dist += stop_row[after]
+                if new_dist < current_dist:
+                    segment = (p, j)
+                    break
+
+            # Or reverse route[i..p-1] so stop links to a near neighbor
+            if segment is None:
+                for candidate in candidates[stop]:
+                    new_edge = stop_row[candidate]
+                    if new_edge >= current_edge:
+                        break
+                    i = position[candidate]
+                    if i < 1 or i >= p - 1:
+                        continue
+                    before_row = dm[route[i-1]]
+                    current_dist = current_edge + before_row[candidate]
+                    new_dist = new_edge + before_row[prev_stop]
+                    if new_dist < current_dist:
+                        segment = (i, p - 1)
+                        break
+
+            if segment:
+                # Reverse segment
+                i, j = segment
+                route[i:j+1] = reversed(route[i:j+1])
+                for idx in range(i, j + 1):
+                    position[route[idx]] = idx
+                improved = True
 
-                # Calculate current distance
-                current_dist = (
-                    distance_matrix[route[i-1]][route[i]] +
-                    distance_matrix[route[j]][route[(j+1) % len(route)]]
-                )
+    return route
 
-                # Calculate new distance if we reverse
-                new_dist = (
-                    distance_matrix[route[i-1]][route[j]] +
-                    distance_matrix[route[i]][route[(j+1) % len(route)]]
-                )
+def _held_karp_kernel(distance_matrix: np.ndarray, start_idx: int) -> np.ndarray:
+    """
+    Held-Karp dynamic program for the shortest open route from start_idx,
+    JIT-compiled with numba when it is installed
 
-                if new_dist < current_dist:
-                    # Reverse segment
-                    route[i:j+1] = reversed(route[i:j+1])
-                    improved = True
+    cost[mask, i] is the shortest route from start_idx through the stops in
+    mask (bits over every other stop) that ends at stop i.
+    """
+    n = distance_matrix.shape[0]
+    others = np.empty(n - 1, dtype=np.int64)
+    k = 0
+    for stop in range(n):
+        if stop != start_idx:
+            others[k] = stop
+            k += 1
+
+    m = n - 1
+    full = 1 << m
+    cost = np.full((full, m), np.inf)
+    parent = np.full((full, m), -1, dtype=np.int64)
+    for i in range(m):
+        cost[1 << i, i] = distance_matrix[start_idx, others[i]]
+
+    for mask in range(1, full):
+        for i in range(m):
+            if not (mask >> i) & 1 or cost[mask, i] == np.inf:
+                continue
+            for j in range(m):
+                if (mask >> j) & 1:
+                    continue
+                next_mask = mask | (1 << j)
+                next_cost = cost[mask, i] + distance_matrix[others[i], others[j]]
+                if next_cost < cost[next_mask, j]:
+                    cost[next_mask, j] = next_cost
+                    parent[next_mask, j] = i
+
+    # Walk the parent table back from the cheapest last stop
+    route = np.empty(n, dtype=np.int64)
+    route[0] = start_idx
+    mask = full - 1
+    i = np.argmin(cost[mask])
+    for pos in range(n - 1, 0, -1):
+        route[pos] = others[i]
+        previous = parent[mask, i]
+        mask ^= 1 << i
+        i = previous
 
     return route
 
-def add_detailed_route_info(churches: List[Dict], route_order: List[int]) -> List[Dict]:
+if NUMBA_AVAILABLE:
+    _held_karp_kernel = njit(cache=True)(_held_karp_kernel)
+
+def held_karp_route(distance_matrix: np.ndarray, start_idx: int = 0) -> List[int]:
     """
-    Add detailed driving information for each segment
+    Solve TSP exactly (open route from start_idx) with pre-computed distance matrix
+    Only practical up to HELD_KARP_MAX_STOPS stops
     """
-    detailed_route = []
-
-    for idx, church_idx in enumerate(route_order):
-        church = churches[church_idx].copy()
-        church['sequence'] = idx + 1
+    n = distance_matrix.shape[0]
 
-        # Get route to next stop
-        if idx < len(route_order) - 1:
-            next_church_idx = route_order[idx + 1]
-            next_church = churches[next_church_idx]
+    if n <= 2:
+        return [start_idx] + [stop for stop in range(n) if stop != start_idx]
 
-            print(f"  Getting route for stop {idx+1} -> {idx+2}")
+    distances = np.ascontiguousarray(distance_matrix, dtype=np.float64)
+    return _held_karp_kernel(distances, start_idx).tolist()
 
-            route_info = get_driving_route(
-                church['latitude'], church['longitude'],
-                next_church['latitude'], next_church['longitude']
-            )
+def add_detailed_route_info(df: pd.DataFrame, route_order: List[int],
+                            distance_matrix: np.ndarray, travel_times: np.ndarray) -> pd.DataFrame:
+    """
+    Add detailed driving information for each segment
 
+    Legs are read from the directed route matrices, so each leg's distance
+    and time are for the direction it is driven; only legs HERE could not
+    route there are requested again from the Routing API.
+    """
+    stops = np.asarray(route_order, dtype=int)
+    lat = df['latitude'].to_numpy(dtype=np.float64)[stops]
+    lng = df['longitude'].to_numpy(dtype=np.float64)[stops]
+    names = df['name'].to_numpy(dtype=object)[stops]
+
+    # Leg i runs from stop i to stop i+1; the last stop has no next leg
+    leg_distances = np.zeros(len(stops))
+    leg_times = np.zeros(len(stops))
+    leg_distances[:-1] = distance_matrix[stops[:-1], stops[1:]]
+    leg_times[:-1] = travel_times[stops[:-1], stops[1:]]
+
+    # Fetch the missing legs, several requests in flight at once
+    missing = np.flatnonzero(np.isnan(leg_times))
+    if len(missing):
+        print(f"  Getting routes for {len(missing)} legs")
+        fetched = get_driving_routes(lat[missing], lng[missing], lat[missing + 1], lng[missing + 1])
+        for idx, route_info in zip(missing, fetched):
             if route_info:
-                church['distance_to_next_km'] = route_info['distance_km']
-                church['distance_to_next_miles'] = route_info['distance_km'] * 0.621371
-                church['drive_time_to_next_min'] = route_info['duration_minutes']
-                church['next_stop'] = next_church['name']
+                leg_distances[idx] = route_info['distance_km']
+                leg_times[idx] = route_info['duration_minutes']
             else:
-                church['distance_to_next_km'] = 0
-                church['distance_to_next_miles'] = 0
-                church['drive_time_to_next_min'] = 0
-                church['next_stop'] = next_church['name']
-
-            time.sleep(0.1)  # Rate limiting
-        else:
-            church['distance_to_next_km'] = 0
-            church['distance_to_next_miles'] = 0
-            church['drive_time_to_next_min'] = 0
-            church['next_stop'] = 'End of route'
+                leg_distances[idx] = 0
+                leg_times[idx] = 0
 
-        detailed_route.append(church)
+    detailed_route = df.iloc[stops].reset_index(drop=True)
+    detailed_route['sequence'] = np.arange(1, len(stops) + 1)
+    detailed_route['distance_to_next_km'] = leg_distances
+    detailed_route['distance_to_next_miles'] = leg_distances * 0.621371
+    detailed_route['drive_time_to_next_min'] = leg_times
+    detailed_route['next_stop'] = np.append(names[1:], 'End of route')
 
     return detailed_route
 
@@ -251,21 +420,21 @@ def verify_circle_route(circle_name: str, input_csv: str, output_dir: str):
 
     # Read current route
     df = pd.read_csv(input_csv)
-    churches = df.to_dict('records')
+    lat = df['latitude'].to_numpy(dtype=np.float64)
+    lng = df['longitude'].to_numpy(dtype=np.float64)
 
-    print(f"Churches in route: {len(churches)}")
+    print(f"Churches in route: {len(df)}")
 
-    if len(churches) <= 1:
+    if len(df) <= 1:
         print("Only 1 church, no optimization needed")
         # Save as verified
         output_csv = f"{output_dir}/{circle_name}_verified.csv"
-        df.to_csv(output_csv, index=False)
+        write_route(df, output_csv)
         return
 
     # Calculate distance matrix using actual driving distances
     print("\n1. Calculating driving distance matrix...")
-    cache_file = f"{output_dir}/{circle_name}_route_cache.json"
-    distance_matrix = calculate_route_matrix(churches, cache_file)
+    directed_distances, travel_times, distance_matrix = calculate_route_matrix(lat, lng)
 
     # Find optimal route
     print("\n2. Optimizing route with actual road distances...")
@@ -273,16 +442,20 @@ def verify_circle_route(circle_name: str, input_csv: str, output_dir: str):
     # Start from first church in original route
     start_idx = 0
 
-    # Generate initial route
-    initial_route = nearest_neighbor_route_with_matrix(distance_matrix, start_idx)
+    if len(df) <= HELD_KARP_MAX_STOPS:
+        # Small enough to find the shortest route exactly
+        print(f"   Solving exactly with Held-Karp ({len(df)} stops)")
+        optimized_route = held_karp_route(distance_matrix, start_idx)
+    else:
+        # Generate initial route
+        initial_route = nearest_neighbor_route_with_matrix(distance_matrix, start_idx)
 
-    # Optimize
-    optimized_route = optimize_route_2opt_with_matrix(distance_matrix, initial_route)
+        # Optimize
+        optimized_route = optimize_route_2opt_with_matrix(distance_matrix, initial_route)
 
     # Calculate total distances
-    original_total = sum(distance_matrix[i][j] for i, j in zip(range(len(churches)), range(1, len(churches))))
-    optimized_total = sum(distance_matrix[optimized_route[i]][optimized_route[i+1]]
-                         for i in range(len(optimized_route) - 1))
+    original_total = route_length(distance_matrix, list(range(len(df))))
+    optimized_total = route_length(distance_matrix, optimized_route)
 
     print(f"   Original route total: {original_total:.2f} km")
     print(f"   Optimized route total: {optimized_total:.2f} km")
@@ -290,30 +463,25 @@ def verify_circle_route(circle_name: str, input_csv: str, output_dir: str):
 
     # Add detailed route info
     print("\n3. Adding detailed driving information...")
-    ordered_churches = [churches[i] for i in optimized_route]
-    detailed_route = add_detailed_route_info(ordered_churches, list(range(len(ordered_churches))))
-
-    # Calculate cumulative stats
-    cumulative_distance = 0
-    cumulative_time = 0
+    detailed_route = add_detailed_route_info(df, optimized_route, directed_distances, travel_times)
 
-    for church in detailed_route:
-        church['cumulative_distance_km'] = cumulative_distance
-        church['cumulative_time_min'] = cumulative_time
-        cumulative_distance += church.get('distance_to_next_km', 0)
-        cumulative_time += church.get('drive_time_to_next_min', 0)
+    # Calculate cumulative stats (distance and time driven before each stop)
+    cumulative_distances = np.cumsum(detailed_route['distance_to_next_km'].to_numpy())
+    cumulative_times = np.cumsum(detailed_route['drive_time_to_next_min'].to_numpy())
+    cumulative_time = float(cumulative_times[-1])
+    detailed_route['cumulative_distance_km'] = np.concatenate(([0.0], cumulative_distances[:-1]))
+    detailed_route['cumulative_time_min'] = np.concatenate(([0.0], cumulative_times[:-1]))
 
     # Save verified route
     print("\n4. Saving verified route...")
-    verified_df = pd.DataFrame(detailed_route)
     output_csv = f"{output_dir}/{circle_name}_verified.csv"
-    verified_df.to_csv(output_csv, index=False)
+    write_route(detailed_route, output_csv)
     print(f"   ✓ Saved to {output_csv}")
 
     # Return stats
     return {
         'circle': circle_name,
-        'churches': len(churches),
+        'churches': len(df),
         'original_distance_km': original_total,
         'optimized_distance_km': optimized_total,
         'improvement_km': original_total - optimized_total,
@@ -4,54 +4,49 @@ Add real driving distances and times to existing optimized routes
 This is faster than full re-optimization since we only need N-1 API calls per circle
 """
 
-import pandas as pd
-import requests
-import time
-import json
 import os
-from typing import Dict, Optional
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pandas as pd
 
-# HERE API key
-HERE_API_KEY = os.environ.get('HERE_API_KEY', '0zt1IVbSQt3cPrM8_jaLXyFoq9TALX4OPXWfIsxGg1s')
+from utils.here import (
+    cache_get, get_driving_routes, haversine_vec, leg_info, matrix_cache_key, write_route
+)
 
-def get_driving_route(origin_lat: float, origin_lng: float,
-                      dest_lat: float, dest_lng: float) -> Optional[Dict]:
+def get_cached_matrix_legs(lat: np.ndarray, lng: np.ndarray) -> List[Optional[Dict]]:
     """
-    Get driving route between two points using HERE Routing API
+    Read each consecutive leg from the route matrix that
+    03_verify_routes_with_here.py cached for the same set of churches
+
+    Returns:
+        Driving info per leg, None where the matrix is not cached or HERE
+        could not route that pair
     """
-    try:
-        url = "https://router.hereapi.com/v8/routes"
-
-        params = {
-            'apiKey': HERE_API_KEY,
-            'transportMode': 'car',
-            'origin': f'{origin_lat},{origin_lng}',
-            'destination': f'{dest_lat},{dest_lng}',
-            'return': 'summary'
-        }
-
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-
-        data = response.json()
-
-        if 'routes' in data and len(data['routes']) > 0:
-            route = data['routes'][0]
-            section = route['sections'][0]
-
-            return {
-                'distance_meters': section['summary']['length'],
-                'distance_km': section['summary']['length'] / 1000,
-                'distance_miles': (section['summary']['length'] / 1000) * 0.621371,
-                'duration_seconds': section['summary']['duration'],
-                'duration_minutes': section['summary']['duration'] / 60,
-                'duration_hours': section['summary']['duration'] / 3600
-            }
-        return None
-
-    except Exception as e:
-        print(f"    Error: {e}")
-        return None
+    key, _, rank = matrix_cache_key(lat, lng)
+
+    cached = cache_get(key)
+    if not cached:
+        return [None] * max(len(lat) - 1, 0)
+
+    distances = np.array(cached['distances_km'])[rank[:-1], rank[1:]]
+    travel_times = np.array(cached['travel_times_min'], dtype=float)[rank[:-1], rank[1:]]
+    return [
+        None if np.isnan(minutes) else leg_info(km * 1000, minutes * 60)
+        for km, minutes in zip(distances.tolist(), travel_times.tolist())
+    ]
+
+def round_values(values: np.ndarray, digits: int) -> List[float]:
+    """
+    Round each value with Python's round(), which rounds the exact binary
+    value; np.round scales first and can round e.g. 1.05 down to 1.0
+    """
+    return [round(value, digits) for value in values.tolist()]
 
 def add_driving_info_to_route(circle_name: str, input_csv: str, output_dir: str):
     """
@@ -63,79 +58,56 @@ def add_driving_info_to_route(circle_name: str, input_csv: str, output_dir: str)
 
     # Read current route
     df = pd.read_csv(input_csv)
-    churches = df.to_dict('records')
-
-    print(f"Churches in route: {len(churches)}")
-
-    enhanced_churches = []
-    total_distance_km = 0
-    total_time_min = 0
-    cumulative_distance = 0
-    cumulative_time = 0
-
-    for idx, church in enumerate(churches):
-        church_enhanced = church.copy()
-        church_enhanced['cumulative_distance_km'] = round(cumulative_distance, 2)
-        church_enhanced['cumulative_distance_miles'] = round(cumulative_distance * 0.621371, 2)
-        church_enhanced['cumulative_time_minutes'] = round(cumulative_time, 1)
-        church_enhanced['cumulative_time_hours'] = round(cumulative_time / 60, 2)
-
-        # Get route to next stop
-        if idx < len(churches) - 1:
-            next_church = churches[idx + 1]
-
-            print(f"  Stop {idx+1} -> {idx+2}: {church['name'][:40]}")
-
-            route_info = get_driving_route(
-                church['latitude'], church['longitude'],
-                next_church['latitude'], next_church['longitude']
-            )
-
-            if route_info:
-                church_enhanced['distance_to_next_km'] = round(route_info['distance_km'], 2)
-                church_enhanced['distance_to_next_miles'] = round(route_info['distance_miles'], 2)
-                church_enhanced['drive_time_to_next_min'] = round(route_info['duration_minutes'], 1)
-                church_enhanced['next_stop'] = next_church['name']
-
-                total_distance_km += route_info['distance_km']
-                total_time_min += route_info['duration_minutes']
-                cumulative_distance += route_info['distance_km']
-                cumulative_time += route_info['duration_minutes']
-            else:
-                # Fallback to straight-line estimate
-                from math import radians, sin, cos, sqrt, atan2
-                R = 6371
-                lat1, lng1 = radians(church['latitude']), radians(church['longitude'])
-                lat2, lng2 = radians(next_church['latitude']), radians(next_church['longitude'])
-                dlat, dlng = lat2 - lat1, lng2 - lng1
-                a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-                distance_km = R * 2 * atan2(sqrt(a), sqrt(1-a))
-
-                church_enhanced['distance_to_next_km'] = round(distance_km, 2)
-                church_enhanced['distance_to_next_miles'] = round(distance_km * 0.621371, 2)
-                church_enhanced['drive_time_to_next_min'] = round(distance_km * 2, 1)  # Rough estimate: 30 km/h
-                church_enhanced['next_stop'] = next_church['name']
-
-                total_distance_km += distance_km
-                total_time_min += distance_km * 2
-                cumulative_distance += distance_km
-                cumulative_time += distance_km * 2
-
-                print(f"    Warning: Using straight-line estimate")
-
-            time.sleep(0.15)  # Rate limiting
-        else:
-            church_enhanced['distance_to_next_km'] = 0
-            church_enhanced['distance_to_next_miles'] = 0
-            church_enhanced['drive_time_to_next_min'] = 0
-            church_enhanced['next_stop'] = 'End of route'
-
-        enhanced_churches.append(church_enhanced)
+    lat = df['latitude'].to_numpy(dtype=np.float64)
+    lng = df['longitude'].to_numpy(dtype=np.float64)
+    names = df['name'].to_numpy(dtype=object)
+
+    print(f"Churches in route: {len(df)}")
+
+    # Reuse legs from 03's cached route matrix, then fetch the rest up
+    # front, several requests in flight at once
+    route_infos = get_cached_matrix_legs(lat, lng)
+    missing = np.array([idx for idx, route_info in enumerate(route_infos) if route_info is None], dtype=int)
+    fetched = get_driving_routes(lat[missing], lng[missing], lat[missing + 1], lng[missing + 1])
+    for idx, route_info in zip(missing.tolist(), fetched):
+        route_infos[idx] = route_info
+
+    # Leg i runs from stop i to stop i+1; legs HERE can't route fall back to
+    # a straight-line estimate at a rough 30 km/h
+    routed = np.array([route_info is not None for route_info in route_infos], dtype=bool)
+    straight_line_km = haversine_vec(lat[:-1], lng[:-1], lat[1:], lng[1:])
+    leg_km = straight_line_km.copy()
+    leg_min = straight_line_km * 2
+    for idx in np.flatnonzero(routed).tolist():
+        leg_km[idx] = route_infos[idx]['distance_km']
+        leg_min[idx] = route_infos[idx]['duration_minutes']
+
+    for idx in range(len(df) - 1):
+        print(f"  Stop {idx+1} -> {idx+2}: {names[idx][:40]}")
+        if not routed[idx]:
+            print(f"    Warning: Using straight-line estimate")
+
+    # Distance and time driven before each stop; the last entry is the total
+    cumulative_distance = np.concatenate(([0.0], np.cumsum(leg_km)))
+    cumulative_time = np.concatenate(([0.0], np.cumsum(leg_min)))
+    total_distance_km = float(cumulative_distance[-1])
+    total_time_min = float(cumulative_time[-1])
+    cumulative_distance = cumulative_distance[:len(df)]
+    cumulative_time = cumulative_time[:len(df)]
+
+    enhanced_df = df.copy()
+    enhanced_df['cumulative_distance_km'] = round_values(cumulative_distance, 2)
+    enhanced_df['cumulative_distance_miles'] = round_values(cumulative_distance * 0.621371, 2)
+    enhanced_df['cumulative_time_minutes'] = round_values(cumulative_time, 1)
+    enhanced_df['cumulative_time_hours'] = round_values(cumulative_time / 60, 2)
+    enhanced_df['distance_to_next_km'] = round_values(leg_km, 2) + [0]
+    enhanced_df['distance_to_next_miles'] = round_values(leg_km * 0.621371, 2) + [0]
+    enhanced_df['drive_time_to_next_min'] = round_values(leg_min, 1) + [0]
+    enhanced_df['next_stop'] = np.append(names[1:], 'End of route')
 
     # Save enhanced route
     output_csv = f"{output_dir}/{circle_name}_with_driving_info.csv"
-    enhanced_df = pd.DataFrame(enhanced_churches)
-    enhanced_df.to_csv(output_csv, index=False)
+    write_route(enhanced_df, output_csv)
 
     print(f"\n  ✓ Route enhanced")
     print(f"  Total distance: {total_distance_km:.2f} km ({total_distance_km*0.621371:.2f} miles)")
@@ -144,13 +116,13 @@ def add_driving_info_to_route(circle_name: str, input_csv: str, output_dir: str)
 
     return {
         'circle': circle_name,
-        'churches': len(churches),
+        'churches': len(df),
         'total_distance_km': round(total_distance_km, 2),
         'total_distance_miles': round(total_distance_km * 0.621371, 2),
         'total_time_minutes': round(total_time_min, 1),
         'total_time_hours': round(total_time_min / 60, 2),
-        'avg_distance_per_stop_km': round(total_distance_km / max(len(churches)-1, 1), 2),
-        'avg_time_per_stop_min': round(total_time_min / max(len(churches)-1, 1), 1)
+        'avg_distance_per_stop_km': round(total_distance_km / max(len(df)-1, 1), 2),
+        'avg_time_per_stop_min': round(total_time_min / max(len(df)-1, 1), 1)
     }
 
 def main():
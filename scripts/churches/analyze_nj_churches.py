@@ -3,10 +3,19 @@
 Analyze NJ church data and display basic information
 """
 
+import argparse
 import pandas as pd
 import sys
 
+# Rows profiled unless --full is given; enough for columns, dtypes and samples
+PREVIEW_ROWS = 1000
+
 def main():
+    parser = argparse.ArgumentParser(description='Analyze NJ church data')
+    parser.add_argument('--full', action='store_true',
+                        help=f'Read every row instead of the first {PREVIEW_ROWS}')
+    args = parser.parse_args()
+
     # Read the Excel file
     excel_file = 'data/church_NJ.xlsx'
 
@@ -16,10 +25,14 @@ def main():
     xl_file = pd.ExcelFile(excel_file)
     print(f"Sheet names: {xl_file.sheet_names}\n")
 
-    # Read the first sheet
-    df = pd.read_excel(excel_file, sheet_name=0)
+    # Read the first sheet from the already open workbook, stopping after
+    # PREVIEW_ROWS rows unless the full sheet was asked for
+    df = xl_file.parse(sheet_name=0, nrows=None if args.full else PREVIEW_ROWS)
 
-    print(f"Total records: {len(df)}")
+    if args.full:
+        print(f"Total records: {len(df)}")
+    else:
+        print(f"Records read: {len(df)} (first {PREVIEW_ROWS} at most; use --full for all)")
     print(f"\nColumns: {df.columns.tolist()}\n")
     print(f"First 10 rows:\n{df.head(10)}\n")
 
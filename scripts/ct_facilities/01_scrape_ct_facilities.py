@@ -7,25 +7,34 @@ Searches for: Senior Centers, City Halls, Community Centers, and Colleges
 import os
 import sys
 import json
-import time
-import requests
 import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 import pandas as pd
 
+from utils.serper import SEARCH_WORKERS, search_maps, search_organic
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "data" / "ct_facilities"
 BOUNDARY_FILE = PROJECT_ROOT / "data" / "ct_target_area_boundary.json"
 OUTPUT_CSV = DATA_DIR / "ct_facilities.csv"
+PROGRESS_DB = DATA_DIR / "scraping_progress.sqlite"
+# Progress file written by earlier versions, imported into PROGRESS_DB once
 PROGRESS_FILE = DATA_DIR / "scraping_progress.json"
 
+# The CSV is written in row chunks through one large buffer, so it goes to
+# disk in a few big writes rather than one per row
+CSV_CHUNK_ROWS = 10000
+CSV_WRITE_BUFFER = 1 << 20
+
 # API Configuration
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 
@@ -82,6 +91,34 @@ FACILITY_TYPES = {
     }
 }
 
+# Aggregator sites and listicles are never facilities themselves
+AGGREGATOR_KEYWORDS = [
+    'yelp', 'yellow pages', 'find', 'directory', 'list of',
+    'best', 'top', 'reviews', 'comparison', 'guide',
+    'indeed', 'linkedin', 'facebook', 'twitter',
+    'mapquest', 'google maps'
+]
+
+# A relevant facility's name contains one of its type's keywords
+FACILITY_TYPE_KEYWORDS = {
+    "senior_center": ['senior', 'elderly', 'aging'],
+    "city_hall": ['hall', 'municipal', 'town', 'city'],
+    "community_center": ['community', 'recreation', 'civic', 'center'],
+    "college": ['college', 'university', 'institute', 'school']
+}
+
+
+def keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """Compile keywords into one case-insensitive substring alternation"""
+    return re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE)
+
+
+AGGREGATOR_PATTERN = keyword_pattern(AGGREGATOR_KEYWORDS)
+FACILITY_TYPE_PATTERNS = {
+    facility_type: keyword_pattern(keywords)
+    for facility_type, keywords in FACILITY_TYPE_KEYWORDS.items()
+}
+
 
 def search_serper(query: str, location: str = "Connecticut") -> List[Dict]:
     """
@@ -90,107 +127,61 @@ def search_serper(query: str, location: str = "Connecticut") -> List[Dict]:
     """
     facilities = []
 
-    # Try Maps API first
-    url = "https://google.serper.dev/maps"
-    payload = {
-        "q": query,
-        "location": location,
-        "gl": "us",
-        "hl": "en"
-    }
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
-
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        # Process places from Maps API
-        if "places" in data:
-            for place in data["places"]:
-                facility = {
-                    "name": place.get("title", ""),
-                    "address": place.get("address", ""),
-                    "phone": place.get("phoneNumber", ""),
-                    "email": "",
-                    "website": place.get("website", ""),
-                    "rating": place.get("rating", ""),
-                    "reviews": place.get("ratingCount", ""),
-                    "latitude": place.get("latitude", ""),
-                    "longitude": place.get("longitude", ""),
-                    "business_hours": place.get("openingHours", ""),
-                    "source": "serper_maps",
-                    "search_query": query,
-                    "location": location,
-                    "found_date": datetime.now().isoformat()
-                }
-                facilities.append(facility)
-
-        # Also try organic search for more results
-        time.sleep(0.5)
-        url = "https://google.serper.dev/search"
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        if "organic" in data:
-            for result in data["organic"][:5]:  # Limit organic results
-                facility = {
-                    "name": result.get("title", ""),
-                    "address": result.get("snippet", ""),
-                    "phone": "",
-                    "email": "",
-                    "website": result.get("link", ""),
-                    "rating": "",
-                    "reviews": "",
-                    "latitude": "",
-                    "longitude": "",
-                    "business_hours": "",
-                    "source": "serper_organic",
-                    "search_query": query,
-                    "location": location,
-                    "found_date": datetime.now().isoformat()
-                }
-                facilities.append(facility)
-
-    except Exception as e:
-        print(f"   ⚠️  Serper API error: {e}")
+    # Every result of one search shares its timestamp
+    found_date = datetime.now().isoformat()
+
+    # Maps results first (cached by utils.serper), then a few organic ones;
+    # both share utils.serper's session and rate limit
+    for place in search_maps(query, location):
+        facility = {
+            "name": place.get("title", ""),
+            "address": place.get("address", ""),
+            "phone": place.get("phoneNumber", ""),
+            "email": "",
+            "website": place.get("website", ""),
+            "rating": place.get("rating", ""),
+            "reviews": place.get("ratingCount", ""),
+            "latitude": place.get("latitude", ""),
+            "longitude": place.get("longitude", ""),
+            "business_hours": place.get("openingHours", ""),
+            "source": "serper_maps",
+            "search_query": query,
+            "location": location,
+            "found_date": found_date
+        }
+        facilities.append(facility)
+
+    for result in search_organic(query, location)[:5]:  # Limit organic results
+        facility = {
+            "name": result.get("title", ""),
+            "address": result.get("snippet", ""),
+            "phone": "",
+            "email": "",
+            "website": result.get("link", ""),
+            "rating": "",
+            "reviews": "",
+            "latitude": "",
+            "longitude": "",
+            "business_hours": "",
+            "source": "serper_organic",
+            "search_query": query,
+            "location": location,
+            "found_date": found_date
+        }
+        facilities.append(facility)
 
     return facilities
 
 
 def is_relevant_facility(name: str, facility_type: str) -> bool:
     """Check if facility name is relevant and not an aggregator"""
-    name_lower = name.lower()
-
     # Filter out aggregator keywords
-    aggregator_keywords = [
-        'yelp', 'yellow pages', 'find', 'directory', 'list of',
-        'best', 'top', 'reviews', 'comparison', 'guide',
-        'indeed', 'linkedin', 'facebook', 'twitter',
-        'mapquest', 'google maps'
-    ]
-
-    for keyword in aggregator_keywords:
-        if keyword in name_lower:
-            return False
+    if AGGREGATOR_PATTERN.search(name):
+        return False
 
     # Type-specific validation
-    if facility_type == "senior_center":
-        relevant = any(kw in name_lower for kw in ['senior', 'elderly', 'aging'])
-    elif facility_type == "city_hall":
-        relevant = any(kw in name_lower for kw in ['hall', 'municipal', 'town', 'city'])
-    elif facility_type == "community_center":
-        relevant = any(kw in name_lower for kw in ['community', 'recreation', 'civic', 'center'])
-    elif facility_type == "college":
-        relevant = any(kw in name_lower for kw in ['college', 'university', 'institute', 'school'])
-    else:
-        relevant = True
-
-    return relevant
+    pattern = FACILITY_TYPE_PATTERNS.get(facility_type)
+    return pattern is None or pattern.search(name) is not None
 
 
 def deduplicate_facilities(facilities: List[Dict]) -> List[Dict]:
@@ -199,10 +190,11 @@ def deduplicate_facilities(facilities: List[Dict]) -> List[Dict]:
     unique_facilities = []
 
     for facility in facilities:
-        # Create a key from name and first part of address
+        # Key on name and first part of address; a tuple hashes its
+        # parts directly instead of joining them into a new string
         name = facility.get('name', '').strip().lower()
         address = facility.get('address', '').strip().lower()
-        key = f"{name}|{address[:50]}"
+        key = (name, address[:50])
 
         if key not in seen and name:
             seen.add(key)
@@ -211,19 +203,53 @@ def deduplicate_facilities(facilities: List[Dict]) -> List[Dict]:
     return unique_facilities
 
 
-def load_progress() -> Dict:
-    """Load scraping progress from JSON file"""
-    if PROGRESS_FILE.exists():
+def open_progress_db() -> sqlite3.Connection:
+    """
+    Open the scraping progress database, importing the old JSON progress
+    file the first time so earlier searches are not repeated
+    """
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(PROGRESS_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS completed_searches(query TEXT PRIMARY KEY)")
+    conn.execute("CREATE TABLE IF NOT EXISTS facilities(key TEXT PRIMARY KEY, facility TEXT)")
+
+    is_empty = conn.execute("SELECT COUNT(*) FROM completed_searches").fetchone()[0] == 0
+    if is_empty and PROGRESS_FILE.exists():
         with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+            legacy = json.load(f)
+        save_progress(conn, legacy.get('completed_searches', []), legacy.get('facilities', {}))
+        print(f"   Imported {len(legacy.get('completed_searches', []))} completed searches from {PROGRESS_FILE}")
 
+    return conn
 
-def save_progress(progress: Dict):
-    """Save scraping progress to JSON file"""
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
+
+def load_progress(conn: sqlite3.Connection) -> Tuple[Set[str], Dict[str, Dict]]:
+    """Load completed searches and facilities found so far, in the order they were found"""
+    completed_searches = {query for (query,) in conn.execute("SELECT query FROM completed_searches")}
+    all_facilities = {
+        key: json.loads(facility)
+        for key, facility in conn.execute("SELECT key, facility FROM facilities ORDER BY rowid")
+    }
+    return completed_searches, all_facilities
+
+
+def save_progress(conn: sqlite3.Connection, queries: List[str], facilities: Dict[str, Dict]):
+    """
+    Record newly completed searches and new or updated facilities in one
+    transaction; only what changed since the last save is written
+    """
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO completed_searches VALUES (?)",
+                         [(query,) for query in queries])
+        # Upsert rather than REPLACE so an updated facility keeps its rowid,
+        # and with it its original position in the output
+        conn.executemany(
+            "INSERT INTO facilities VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET facility = excluded.facility",
+            [(key, json.dumps(facility)) for key, facility in facilities.items()]
+        )
 
 
 def main():
@@ -234,9 +260,8 @@ def main():
     print()
 
     # Load existing progress
-    progress = load_progress()
-    completed_searches = set(progress.get('completed_searches', []))
-    all_facilities = progress.get('facilities', {})
+    progress_db = open_progress_db()
+    completed_searches, all_facilities = load_progress(progress_db)
 
     if all_facilities:
         print(f"📊 Progress: {len(completed_searches)} searches completed, {len(all_facilities)} facilities found")
@@ -256,45 +281,49 @@ def main():
     print(f"⏳ Remaining: {len(searches)}")
     print()
 
-    # Perform searches
-    for idx, (query, town, facility_type, search_term) in enumerate(searches, 1):
-        print(f"[{idx}/{len(searches)}] Searching: '{search_term}' in {town}")
+    # Perform searches concurrently (the shared token bucket keeps them under
+    # Serper's rate limit); results are merged here on the main thread in
+    # search order, so later searches still win ties exactly as before
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor:
+        results = executor.map(lambda search: search_serper(search[0], search[1]), searches)
+
+        # Searches and facilities not yet written to the progress database
+        new_searches = []
+        new_facilities = {}
 
-        facilities = search_serper(query, town)
+        for idx, ((query, town, facility_type, search_term), facilities) in enumerate(zip(searches, results), 1):
+            print(f"[{idx}/{len(searches)}] Searched: '{search_term}' in {town}")
 
-        # Filter relevant facilities
-        relevant_count = 0
-        for facility in facilities:
-            if is_relevant_facility(facility['name'], facility_type):
-                # Add facility type
-                facility['facility_type'] = facility_type
+            # Filter relevant facilities
+            relevant_count = 0
+            for facility in facilities:
+                if is_relevant_facility(facility['name'], facility_type):
+                    # Add facility type
+                    facility['facility_type'] = facility_type
 
-                # Use name|address as unique key
-                key = f"{facility['name']}|{facility.get('address', '')}"
-                all_facilities[key] = facility
-                relevant_count += 1
+                    # Use name|address as unique key
+                    key = f"{facility['name']}|{facility.get('address', '')}"
+                    all_facilities[key] = facility
+                    new_facilities[key] = facility
+                    relevant_count += 1
 
-        print(f"   ✓ Found {relevant_count} relevant facilities")
+            print(f"   ✓ Found {relevant_count} relevant facilities")
 
-        # Mark search as completed
-        completed_searches.add(query)
+            # Mark search as completed
+            completed_searches.add(query)
+            new_searches.append(query)
 
-        # Rate limiting
-        time.sleep(0.5)
+            # Save progress every 10 searches
+            if idx % 10 == 0:
+                save_progress(progress_db, new_searches, new_facilities)
+                new_searches.clear()
+                new_facilities.clear()
+                print(f"   💾 Progress saved ({len(all_facilities)} total facilities)")
 
-        # Save progress every 10 searches
-        if idx % 10 == 0:
-            progress['completed_searches'] = list(completed_searches)
-            progress['facilities'] = all_facilities
-            progress['last_updated'] = datetime.now().isoformat()
-            save_progress(progress)
-            print(f"   💾 Progress saved ({len(all_facilities)} total facilities)")
+        # Final save
+        save_progress(progress_db, new_searches, new_facilities)
 
-    # Final save
-    progress['completed_searches'] = list(completed_searches)
-    progress['facilities'] = all_facilities
-    progress['last_updated'] = datetime.now().isoformat()
-    save_progress(progress)
+    progress_db.close()
 
     print()
     print("=" * 80)
@@ -321,7 +350,8 @@ def main():
     df = df[columns]
 
     # Save to CSV
-    df.to_csv(OUTPUT_CSV, index=False)
+    with open(OUTPUT_CSV, 'w', encoding='utf-8', newline='', buffering=CSV_WRITE_BUFFER) as f:
+        df.to_csv(f, index=False, chunksize=CSV_CHUNK_ROWS)
 
     print()
     print("=" * 80)
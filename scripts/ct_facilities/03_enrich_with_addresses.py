@@ -5,20 +5,26 @@ Enrich CT facilities with addresses and business hours using Serper Google Maps
 
 import os
 import sys
-import time
-import requests
+import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Set
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 import pandas as pd
 
+from utils.serper import SEARCH_WORKERS, search_maps
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "data" / "ct_facilities"
 INPUT_CSV = DATA_DIR / "ct_facilities.csv"
 OUTPUT_CSV = DATA_DIR / "ct_facilities_with_addresses.csv"
+# Append-only log of each enriched record's changed fields, so an
+# interrupted run resumes where it stopped; removed once the CSV is written
+CHECKPOINT_FILE = OUTPUT_CSV.with_suffix(".jsonl")
 
 # API Configuration
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
@@ -31,51 +37,28 @@ if not SERPER_API_KEY:
 def search_google_maps(query: str, location: str = "Connecticut") -> dict:
     """
     Search using Serper Google Maps API
-    Returns place details with addresses and business hours
+    Returns the first place's details with addresses and business hours
     """
-    url = "https://google.serper.dev/maps"
-
-    payload = {
-        "q": query,
-        "location": location,
-        "gl": "us",
-        "hl": "en"
-    }
-
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
-
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        # Google Maps API returns 'places' array
-        places = data.get("places", [])
-        if places:
-            return places[0]  # Return first result
-        return {}
-    except Exception as e:
-        print(f"   ⚠️  Serper Maps API error: {e}")
-        return {}
-
-
-def enrich_facility(row: pd.Series) -> pd.Series:
+    places = search_maps(query, location)
+    if places:
+        return places[0]  # Return first result
+    return {}
+
+
+def enrich_facility(record: dict) -> dict:
     """Enrich a facility record with address and business hours from Google Maps"""
 
     # Skip if already has complete data
-    has_address = pd.notna(row['address']) and row['address'].strip()
-    has_coords = pd.notna(row['latitude']) and pd.notna(row['longitude'])
-    has_hours = pd.notna(row['business_hours']) and row['business_hours'].strip()
+    has_address = pd.notna(record['address']) and record['address'].strip()
+    has_coords = pd.notna(record['latitude']) and pd.notna(record['longitude'])
+    has_hours = pd.notna(record['business_hours']) and record['business_hours'].strip()
 
     if has_address and has_coords and has_hours:
-        return row
+        return record
 
     # Build search query
-    name = row['name']
-    location_search = row.get('location', 'Connecticut')
+    name = record['name']
+    location_search = record.get('location', 'Connecticut')
 
     query = f"{name} {location_search}"
 
@@ -87,29 +70,69 @@ def enrich_facility(row: pd.Series) -> pd.Series:
     if place:
         # Update fields if missing
         if not has_address and place.get('address'):
-            row['address'] = place['address']
+            record['address'] = place['address']
             print(f"    ✓ Found address: {place['address'][:60]}")
 
-        if not row.get('phone') and place.get('phoneNumber'):
-            row['phone'] = place['phoneNumber']
+        if not record.get('phone') and place.get('phoneNumber'):
+            record['phone'] = place['phoneNumber']
 
         if not has_coords:
             if place.get('latitude'):
-                row['latitude'] = place['latitude']
+                record['latitude'] = place['latitude']
             if place.get('longitude'):
-                row['longitude'] = place['longitude']
+                record['longitude'] = place['longitude']
 
         if place.get('rating'):
-            row['rating'] = place['rating']
+            record['rating'] = place['rating']
 
         if place.get('ratingCount'):
-            row['reviews'] = place['ratingCount']
+            record['reviews'] = place['ratingCount']
 
         if not has_hours and place.get('openingHours'):
-            row['business_hours'] = place['openingHours']
+            record['business_hours'] = place['openingHours']
             print(f"    ✓ Found business hours")
 
-    return row
+    return record
+
+
+def input_fingerprint(records: List[dict]) -> dict:
+    """Identify the input CSV a checkpoint log was written against"""
+    stat = INPUT_CSV.stat()
+    return {"input": str(INPUT_CSV), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rows": len(records)}
+
+
+def load_checkpoint(records: List[dict]) -> Set[int]:
+    """
+    Apply the changes logged by an interrupted run; return the records already enriched
+
+    Log entries are keyed by row position, so the log's header line records
+    the input CSV it was written against. A log for a different (e.g.
+    regenerated) input is discarded and a fresh one started.
+    """
+    done = set()
+    header = json.dumps({"fingerprint": input_fingerprint(records)}) + "\n"
+    if CHECKPOINT_FILE.exists():
+        with open(CHECKPOINT_FILE, 'r') as f:
+            if f.readline() == header:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn line from a crash mid-write; that record is redone
+                        continue
+                    records[entry['idx']].update(entry['patch'])
+                    done.add(entry['idx'])
+            else:
+                print(f"   ⚠️  Discarding checkpoint written for a different input: {CHECKPOINT_FILE}")
+        if not done:
+            CHECKPOINT_FILE.unlink()
+
+    if not CHECKPOINT_FILE.exists():
+        with open(CHECKPOINT_FILE, 'w') as f:
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+    return done
 
 
 def main():
@@ -142,30 +165,49 @@ def main():
     print("🔍 Enriching records with Google Maps data...")
     print()
 
-    enriched_count = 0
-    for idx in range(len(df)):
-        if idx % 10 == 0:
-            print(f"[{idx + 1}/{len(df)}]")
-
-        original_address = df.loc[idx, 'address']
-        original_hours = df.loc[idx, 'business_hours']
-
-        df.loc[idx] = enrich_facility(df.loc[idx])
-
-        # Track progress
-        if pd.notna(df.loc[idx, 'address']) and (pd.isna(original_address) or original_address == ''):
-            enriched_count += 1
-
-        # Rate limiting - be nice to the API
-        time.sleep(0.5)
-
-        # Save progress every 50 records
-        if (idx + 1) % 50 == 0:
-            df.to_csv(OUTPUT_CSV, index=False)
-            print(f"  💾 Progress saved ({enriched_count} enriched)")
-
-    # Final save
+    # Records are enriched concurrently (utils.serper rate-limits the live
+    # searches) as plain dicts, so no per-row Series is built or written
+    # back; a DataFrame is only rebuilt when saving
+    records = df.to_dict('records')
+    original_addresses = df['address'].tolist()
+
+    done = load_checkpoint(records)
+    if done:
+        print(f"   ↻ Resuming: {len(done)} records already enriched")
+    todo = [idx for idx in range(len(records)) if idx not in done]
+
+    def is_enriched(idx: int) -> bool:
+        original_address = original_addresses[idx]
+        return pd.notna(records[idx]['address']) and (pd.isna(original_address) or original_address == '')
+
+    enriched_count = sum(1 for idx in done if is_enriched(idx))
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor, \
+            open(CHECKPOINT_FILE, 'a') as checkpoint:
+        # Workers enrich copies, so the fields they changed can be logged
+        enriched = executor.map(lambda idx: enrich_facility(dict(records[idx])), todo)
+
+        for count, (idx, record) in enumerate(zip(todo, enriched), 1):
+            if idx % 10 == 0:
+                print(f"[{idx + 1}/{len(records)}]")
+
+            # Log only the changed fields, durably, before moving on
+            patch = {field: value for field, value in record.items() if value is not records[idx][field]}
+            checkpoint.write(json.dumps({"idx": idx, "patch": patch}) + "\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+            records[idx] = record
+
+            # Track progress
+            if is_enriched(idx):
+                enriched_count += 1
+
+            if count % 50 == 0:
+                print(f"  💾 Progress logged ({enriched_count} enriched)")
+
+    # Write the CSV once, then drop the log it supersedes
+    df = pd.DataFrame(records, columns=df.columns)
     df.to_csv(OUTPUT_CSV, index=False)
+    CHECKPOINT_FILE.unlink()
 
     print()
     print("=" * 80)
@@ -6,21 +6,27 @@ Refine invalid addresses in CT facilities CSV using Serper Google Maps API
 import os
 import sys
 import re
-import time
-import requests
+import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Set
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
+import numpy as np
 import pandas as pd
 
+from utils.serper import SEARCH_WORKERS, search_maps
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "data" / "ct_facilities"
 INPUT_CSV = DATA_DIR / "ct_facilities_with_addresses.csv"
 OUTPUT_CSV = DATA_DIR / "ct_facilities_with_addresses_refined.csv"
+# Append-only log of each refined record's changed fields, so an
+# interrupted run resumes where it stopped; removed once the CSV is written
+CHECKPOINT_FILE = OUTPUT_CSV.with_suffix(".jsonl")
 
 # API Configuration
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
@@ -29,6 +35,10 @@ if not SERPER_API_KEY:
     print("❌ Error: SERPER_API_KEY environment variable not set")
     sys.exit(1)
 
+# A valid address starts with a house number; ASCII digits only, so the
+# per-value and vectorised (possibly Arrow-backed) checks always agree
+ADDRESS_START_PATTERN = re.compile(r'[0-9]')
+
 
 def is_valid_address(address: str) -> bool:
     """
@@ -44,58 +54,44 @@ def is_valid_address(address: str) -> bool:
         return False
 
     # Valid address should start with a number
-    if not re.match(r'^\d', address):
+    if not ADDRESS_START_PATTERN.match(address):
         return False
 
     return True
 
 
+def valid_address_mask(addresses: pd.Series) -> pd.Series:
+    """
+    is_valid_address over a whole column at once, with pandas' vectorised
+    string methods instead of a Python call per cell
+    """
+    addresses = addresses.fillna('').astype(str).str.strip()
+    return (addresses.str.len() <= 200) & addresses.str.match(ADDRESS_START_PATTERN.pattern)
+
+
 def search_google_maps(query: str, location: str = "Connecticut") -> List[Dict]:
     """
     Search using Serper Google Maps API
     Returns place results with addresses
     """
-    url = "https://google.serper.dev/maps"
-
-    payload = {
-        "q": query,
-        "location": location,
-        "gl": "us",
-        "hl": "en"
-    }
-
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
-
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+    return search_maps(query, location)
 
-        # Google Maps API returns 'places' array
-        return data.get("places", [])
-    except Exception as e:
-        print(f"   ⚠️  Serper Maps API error: {e}")
-        return []
 
-
-def refine_address(row: pd.Series) -> pd.Series:
+def refine_address(record: dict) -> dict:
     """Refine a facility record with proper address from Google Maps"""
 
     # Skip if already has valid address
-    if is_valid_address(row['address']):
-        return row
+    if is_valid_address(record['address']):
+        return record
 
     # Build search query
-    name = row['name']
-    location_search = row.get('location', 'Connecticut')
+    name = record['name']
+    location_search = record.get('location', 'Connecticut')
 
     query = f"{name} {location_search}"
 
     print(f"  Searching Maps for: {name[:50]}...")
-    print(f"    Current invalid address: {str(row['address'])[:80]}...")
+    print(f"    Current invalid address: {str(record['address'])[:80]}...")
 
     # Search Google Maps
     places = search_google_maps(query, location_search)
@@ -106,28 +102,68 @@ def refine_address(row: pd.Series) -> pd.Series:
 
         # Update address if found
         if place.get('address'):
-            row['address'] = place['address']
+            record['address'] = place['address']
             print(f"    ✓ Refined address: {place['address'][:60]}")
 
         # Update other fields if missing
-        if place.get('phoneNumber') and (not row['phone'] or pd.isna(row['phone'])):
-            row['phone'] = place['phoneNumber']
+        if place.get('phoneNumber') and (not record['phone'] or pd.isna(record['phone'])):
+            record['phone'] = place['phoneNumber']
 
         if place.get('latitude'):
-            row['latitude'] = place['latitude']
+            record['latitude'] = place['latitude']
 
         if place.get('longitude'):
-            row['longitude'] = place['longitude']
+            record['longitude'] = place['longitude']
 
-        if place.get('rating') and (not row['rating'] or pd.isna(row['rating'])):
-            row['rating'] = place['rating']
+        if place.get('rating') and (not record['rating'] or pd.isna(record['rating'])):
+            record['rating'] = place['rating']
 
-        if place.get('ratingCount') and (not row['reviews'] or pd.isna(row['reviews'])):
-            row['reviews'] = place['ratingCount']
+        if place.get('ratingCount') and (not record['reviews'] or pd.isna(record['reviews'])):
+            record['reviews'] = place['ratingCount']
     else:
         print(f"    ✗ No results found")
 
-    return row
+    return record
+
+
+def input_fingerprint(records: List[dict]) -> dict:
+    """Identify the input CSV a checkpoint log was written against"""
+    stat = INPUT_CSV.stat()
+    return {"input": str(INPUT_CSV), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rows": len(records)}
+
+
+def load_checkpoint(records: List[dict]) -> Set[int]:
+    """
+    Apply the changes logged by an interrupted run; return the records already refined
+
+    Log entries are keyed by row position, so the log's header line records
+    the input CSV it was written against. A log for a different (e.g.
+    regenerated) input is discarded and a fresh one started.
+    """
+    done = set()
+    header = json.dumps({"fingerprint": input_fingerprint(records)}) + "\n"
+    if CHECKPOINT_FILE.exists():
+        with open(CHECKPOINT_FILE, 'r') as f:
+            if f.readline() == header:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn line from a crash mid-write; that record is redone
+                        continue
+                    records[entry['idx']].update(entry['patch'])
+                    done.add(entry['idx'])
+            else:
+                print(f"   ⚠️  Discarding checkpoint written for a different input: {CHECKPOINT_FILE}")
+        if not done:
+            CHECKPOINT_FILE.unlink()
+
+    if not CHECKPOINT_FILE.exists():
+        with open(CHECKPOINT_FILE, 'w') as f:
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+    return done
 
 
 def main():
@@ -147,7 +183,7 @@ def main():
     print(f"   ✓ Loaded {len(df)} facilities")
 
     # Count invalid addresses
-    invalid_addresses = df['address'].apply(lambda x: not is_valid_address(x))
+    invalid_addresses = ~valid_address_mask(df['address'])
     print(f"   Invalid addresses to refine: {invalid_addresses.sum()}")
     print()
 
@@ -155,32 +191,49 @@ def main():
     print("🔍 Refining records with invalid addresses...")
     print()
 
-    refined_count = 0
-    for idx in range(len(df)):
-        # Only process rows with invalid addresses
-        if not is_valid_address(df.loc[idx, 'address']):
+    # Only rows with invalid addresses are refined; they are searched
+    # concurrently (utils.serper rate-limits the live searches) as plain
+    # dicts, and a DataFrame is only rebuilt when saving
+    records = df.to_dict('records')
+
+    done = load_checkpoint(records)
+    if done:
+        print(f"   ↻ Resuming: {len(done)} records already refined")
+    # Rows not in the log still hold their loaded address, so the mask
+    # computed on load picks them out
+    todo = [idx for idx in np.flatnonzero(invalid_addresses.to_numpy(dtype=bool)).tolist() if idx not in done]
+
+    refined_count = sum(1 for idx in done if is_valid_address(records[idx]['address']))
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor, \
+            open(CHECKPOINT_FILE, 'a') as checkpoint:
+        # Workers refine copies, so the fields they changed can be logged
+        refined = executor.map(lambda idx: refine_address(dict(records[idx])), todo)
+
+        for count, (idx, record) in enumerate(zip(todo, refined), 1):
             if refined_count % 10 == 0 and refined_count > 0:
                 print(f"[{refined_count} refined so far]")
 
-            df.loc[idx] = refine_address(df.loc[idx])
+            # Log only the changed fields, durably, before moving on
+            patch = {field: value for field, value in record.items() if value is not records[idx][field]}
+            checkpoint.write(json.dumps({"idx": idx, "patch": patch}) + "\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+            records[idx] = record
 
             # Check if address was refined
-            if is_valid_address(df.loc[idx, 'address']):
+            if is_valid_address(record['address']):
                 refined_count += 1
 
-            # Rate limiting - be nice to the API
-            time.sleep(0.5)
-
-            # Save progress every 50 records
-            if (refined_count + 1) % 50 == 0:
-                df.to_csv(OUTPUT_CSV, index=False)
-                print(f"  💾 Progress saved ({refined_count} addresses refined)")
+            if count % 50 == 0:
+                print(f"  💾 Progress logged ({refined_count} addresses refined)")
 
-    # Final save
+    # Write the CSV once, then drop the log it supersedes
+    df = pd.DataFrame(records, columns=df.columns)
     df.to_csv(OUTPUT_CSV, index=False)
+    CHECKPOINT_FILE.unlink()
 
     # Count final stats
-    final_valid = df['address'].apply(is_valid_address).sum()
+    final_valid = valid_address_mask(df['address']).sum()
     final_invalid = len(df) - final_valid
 
     print()
@@ -3,7 +3,6 @@
 Export CT Community Facilities to KMZ for Google Maps
 """
 
-import os
 import sys
 import zipfile
 from pathlib import Path
@@ -15,6 +14,8 @@ import pandas as pd
 import simplekml
 from simplekml import Kml
 
+from utils.serper import get_api_key, search_maps
+
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "data" / "ct_facilities"
@@ -27,45 +28,24 @@ def get_coordinates_from_serper(name: str, address: str) -> tuple:
     """
     Get coordinates for facility using Serper API
     """
-    import requests
-    import time
-
-    SERPER_API_KEY = os.getenv("SERPER_API_KEY")
-
-    if not SERPER_API_KEY:
+    if not get_api_key():
         return None, None
 
     # Build search query
     query = f"{name} {address}"
 
-    url = "https://google.serper.dev/maps"
-    payload = {
-        "q": query,
-        "location": "Connecticut",
-        "gl": "us"
-    }
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
+    places = search_maps(query, "Connecticut")
 
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-
-        # Check for places results
-        if "places" in data and len(data["places"]) > 0:
-            place = data["places"][0]
-            lat = place.get("latitude")
-            lon = place.get("longitude")
-            if lat and lon:
+    # Check for places results
+    if places:
+        place = places[0]
+        lat = place.get("latitude")
+        lon = place.get("longitude")
+        if lat and lon:
+            try:
                 return float(lat), float(lon)
-
-        time.sleep(0.5)  # Rate limiting
-
-    except Exception as e:
-        print(f"   ⚠️  Geocoding error for {name}: {e}")
+            except (ValueError, TypeError) as e:
+                print(f"   ⚠️  Geocoding error for {name}: {e}")
 
     return None, None
 
@@ -4,124 +4,167 @@ Convert pharmacy CSV data to KML/KMZ format for Google My Maps import
 """
 import sys
 import os
-import csv
 import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
 from pathlib import Path
 from zipfile import ZipFile
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Default CSV file path
 DEFAULT_CSV = 'data/area9_pharmacies.csv'
 
+KML_NAMESPACE = "http://www.opengis.net/kml/2.2"
+
+# Indentation per nesting level in the written KML
+INDENT = "  "
+
+# Quote entities escaped on top of saxutils' default &, < and >
+XML_QUOTE_ENTITIES = {'"': "&quot;", "'": "&apos;"}
+
+# Placemark icons, indexed by the rating bucket from classify_rows:
+# no rating, >= 4.5, >= 4.0, >= 3.0, below 3.0
+ICON_URLS = [
+    "http://maps.google.com/mapfiles/ms/icons/blue-dot.png",
+    "http://maps.google.com/mapfiles/ms/icons/green-dot.png",
+    "http://maps.google.com/mapfiles/ms/icons/yellow-dot.png",
+    "http://maps.google.com/mapfiles/ms/icons/orange-dot.png",
+    "http://maps.google.com/mapfiles/ms/icons/red-dot.png",
+]
+
 
 def escape_xml(text):
     """Escape XML special characters"""
     if text is None:
         return ""
-    text = str(text)
-    return (text.replace("&", "&amp;")
-                .replace("<", "&lt;")
-                .replace(">", "&gt;")
-                .replace('"', "&quot;")
-                .replace("'", "&apos;"))
+    return escape(str(text), XML_QUOTE_ENTITIES)
 
 
 def format_description(row):
     """Format pharmacy information as HTML description"""
+    # Each field is looked up once, through locally bound methods
+    get = row.get
     desc_parts = []
+    add = desc_parts.append
     
-    if row.get('address'):
-        desc_parts.append(f"<b>Address:</b> {escape_xml(row['address'])}")
+    address = get('address')
+    if address:
+        add(f"<b>Address:</b> {escape_xml(address)}")
     
-    if row.get('phone'):
-        desc_parts.append(f"<b>Phone:</b> {escape_xml(row['phone'])}")
+    phone = get('phone')
+    if phone:
+        add(f"<b>Phone:</b> {escape_xml(phone)}")
     
-    if row.get('website'):
-        website = escape_xml(row['website'])
-        desc_parts.append(f"<b>Website:</b> <a href='{website}' target='_blank'>{website}</a>")
+    website = get('website')
+    if website:
+        website = escape_xml(website)
+        add(f"<b>Website:</b> <a href='{website}' target='_blank'>{website}</a>")
     
-    if row.get('rating'):
+    rating_text = get('rating')
+    if rating_text:
         try:
-            rating = float(row['rating'])
-            total_ratings = row.get('total_ratings', 0)
+            rating = float(rating_text)
+            total_ratings = get('total_ratings', 0)
             if total_ratings:
                 try:
                     total_int = int(float(total_ratings))
-                    desc_parts.append(f"<b>Rating:</b> {rating:.1f} ⭐ ({total_int} reviews)")
+                    add(f"<b>Rating:</b> {rating:.1f} ⭐ ({total_int} reviews)")
                 except (ValueError, TypeError):
-                    desc_parts.append(f"<b>Rating:</b> {rating:.1f} ⭐")
+                    add(f"<b>Rating:</b> {rating:.1f} ⭐")
             else:
-                desc_parts.append(f"<b>Rating:</b> {rating:.1f} ⭐")
+                add(f"<b>Rating:</b> {rating:.1f} ⭐")
         except (ValueError, TypeError):
-            desc_parts.append(f"<b>Rating:</b> {escape_xml(row['rating'])}")
+            add(f"<b>Rating:</b> {escape_xml(rating_text)}")
     
-    if row.get('hours'):
-        hours = escape_xml(row['hours']).replace(' | ', '<br>')
-        desc_parts.append(f"<b>Hours:</b><br>{hours}")
+    hours = get('hours')
+    if hours:
+        hours = escape_xml(hours).replace(' | ', '<br>')
+        add(f"<b>Hours:</b><br>{hours}")
     
-    if row.get('is_open_now') is not None:
-        status = "🟢 Open Now" if row['is_open_now'] else "🔴 Closed"
-        desc_parts.append(f"<b>Status:</b> {status}")
+    is_open_now = get('is_open_now')
+    if is_open_now is not None:
+        status = "🟢 Open Now" if is_open_now else "🔴 Closed"
+        add(f"<b>Status:</b> {status}")
     
-    if row.get('google_maps_url'):
-        maps_url = escape_xml(row['google_maps_url'])
-        desc_parts.append(f"<br><a href='{maps_url}' target='_blank'>View on Google Maps</a>")
+    maps_url = get('google_maps_url')
+    if maps_url:
+        maps_url = escape_xml(maps_url)
+        add(f"<br><a href='{maps_url}' target='_blank'>View on Google Maps</a>")
     
-    return "<br>".join(desc_parts) if desc_parts else ""
+    return "<br>".join(desc_parts)
 
 
-def get_icon_style(rating):
-    """Get icon style based on rating"""
-    if rating is None or rating == "":
-        return "http://maps.google.com/mapfiles/ms/icons/blue-dot.png"
-    
-    try:
-        rating_float = float(rating)
-        if rating_float >= 4.5:
-            return "http://maps.google.com/mapfiles/ms/icons/green-dot.png"
-        elif rating_float >= 4.0:
-            return "http://maps.google.com/mapfiles/ms/icons/yellow-dot.png"
-        elif rating_float >= 3.0:
-            return "http://maps.google.com/mapfiles/ms/icons/orange-dot.png"
-        else:
-            return "http://maps.google.com/mapfiles/ms/icons/red-dot.png"
-    except (ValueError, TypeError):
-        return "http://maps.google.com/mapfiles/ms/icons/blue-dot.png"
+def numeric_column(df, field):
+    """One CSV column as a float64 array, NaN where blank or not a number"""
+    if field not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=np.float64)
+
+
+def classify_rows(latitudes, longitudes, ratings):
+    """
+    Return which rows have both coordinates and each row's ICON_URLS bucket,
+    computed over whole columns at once
+    """
+    has_coordinates = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    icon_buckets = np.select([np.isnan(ratings), ratings >= 4.5, ratings >= 4.0, ratings >= 3.0],
+                             [0, 1, 2, 3], default=4)
+    return has_coordinates, icon_buckets
+
+
+def write_element(kml, element, level):
+    """Pretty-print one element onto the KML stream at the given nesting level"""
+    ET.indent(element, space=INDENT, level=level)
+    kml.write(INDENT * level + ET.tostring(element, encoding='unicode') + "\n")
 
 
 def csv_to_kml(csv_file, kml_file):
     """Convert CSV to KML format"""
-    # Create KML root element
-    kml = ET.Element("kml", xmlns="http://www.opengis.net/kml/2.2")
-    document = ET.SubElement(kml, "Document")
-    
-    # Add document metadata
-    name = ET.SubElement(document, "name")
+    # Read CSV as text, keeping blank cells as empty strings
+    df = pd.read_csv(csv_file, dtype=str, keep_default_na=False, encoding='utf-8')
+
+    # Coerce the numeric columns in bulk, then classify every row at once
+    has_coordinates, icon_buckets = classify_rows(
+        numeric_column(df, 'latitude'), numeric_column(df, 'longitude'), numeric_column(df, 'rating')
+    )
+
+    # Only rows with coordinates become placemarks
+    valid = np.flatnonzero(has_coordinates)
+    rows = df.iloc[valid].to_dict('records')
+    icon_urls = [ICON_URLS[bucket] for bucket in icon_buckets[valid].tolist()]
+
+    # Document metadata
+    name = ET.Element("name")
     name.text = "Area #9 Pharmacies (Chelsea/NoMad)"
     
-    description = ET.SubElement(document, "description")
+    description = ET.Element("description")
     description.text = f"Pharmacies in District #9 (Chelsea/NoMad) - Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
     
-    # Read CSV and create placemarks
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        
-        for row in reader:
-            # Skip rows without coordinates
-            if not row.get('latitude') or not row.get('longitude'):
-                continue
-            
-            try:
-                lat = float(row['latitude'])
-                lng = float(row['longitude'])
-            except (ValueError, TypeError):
-                continue
-            
+    # Placemarks only differ by icon href, so each <Style> subtree is built
+    # once per icon and shared by every placemark that uses it
+    icon_styles = {}
+
+    # Stream the KML: each placemark is serialised as soon as it is built
+    # instead of holding a DOM of every pharmacy until the end
+    with open(kml_file, 'w', encoding='utf-8', newline='') as kml:
+        kml.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        kml.write(f'<kml xmlns="{KML_NAMESPACE}">\n{INDENT}<Document>\n')
+        write_element(kml, name, level=2)
+        write_element(kml, description, level=2)
+
+        # Create placemarks
+        for row, icon_url in zip(rows, icon_urls):
+            # Parsed from the original text so coordinates keep every digit
+            lat = float(row['latitude'])
+            lng = float(row['longitude'])
+
             # Create placemark
-            placemark = ET.SubElement(document, "Placemark")
+            placemark = ET.Element("Placemark")
             
             # Name
             name_elem = ET.SubElement(placemark, "name")
@@ -132,11 +175,13 @@ def csv_to_kml(csv_file, kml_file):
             desc_elem.text = format_description(row)
             
             # Style
-            style = ET.SubElement(placemark, "Style")
-            icon_style = ET.SubElement(style, "IconStyle")
-            icon = ET.SubElement(icon_style, "Icon")
-            href = ET.SubElement(icon, "href")
-            href.text = get_icon_style(row.get('rating'))
+            style = icon_styles.get(icon_url)
+            if style is None:
+                style = ET.Element("Style")
+                href = ET.SubElement(ET.SubElement(ET.SubElement(style, "IconStyle"), "Icon"), "href")
+                href.text = icon_url
+                icon_styles[icon_url] = style
+            placemark.append(style)
             
             # Point coordinates
             point = ET.SubElement(placemark, "Point")
@@ -154,11 +199,10 @@ def csv_to_kml(csv_file, kml_file):
                     data = ET.SubElement(extended_data, "Data", name=field)
                     value = ET.SubElement(data, "value")
                     value.text = escape_xml(str(row[field]))
-    
-    # Write KML file
-    tree = ET.ElementTree(kml)
-    ET.indent(tree, space="  ")  # Pretty print
-    tree.write(kml_file, encoding='utf-8', xml_declaration=True)
+
+            write_element(kml, placemark, level=2)
+
+        kml.write(f'{INDENT}</Document>\n</kml>')
     
     print(f"✓ KML file created: {kml_file}")
     return kml_file
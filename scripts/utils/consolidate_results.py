@@ -6,8 +6,18 @@ Can be run standalone or as part of the scraping pipeline.
 
 import csv
 import sys
+from collections import Counter
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Dict, Tuple
+
+# Try to import pyarrow for its vectorised C++ CSV parser
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 
 # Configuration
@@ -23,35 +33,63 @@ FIELDNAMES = [
 ]
 
 
-def load_district_files() -> List[Dict]:
-    """Load all district CSV files."""
-    all_pharmacies = []
+def read_district_file(district_file: Path) -> List[Dict]:
+    """Read one district CSV file into row dicts, keeping every value as text."""
+    if PYARROW_AVAILABLE:
+        with open(district_file, 'r', encoding='utf-8', newline='') as f:
+            header = next(csv.reader(f), [])
+
+        try:
+            # Parse in C++, typing every column as a non-null string so values
+            # come back exactly as csv.DictReader would return them
+            table = pa_csv.read_csv(
+                district_file,
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={field: pa.string() for field in header}
+                )
+            )
+            return table.to_pylist()
+        except pa.ArrowInvalid:
+            # Empty or ragged files; csv.DictReader copes with those
+            pass
+
+    with open(district_file, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def load_district_files() -> Tuple[Dict[str, Dict], int]:
+    """
+    Load all district CSV files, deduplicating by place_id as each one is read.
+
+    Returns:
+        (unique pharmacies keyed by place_id, total rows read)
+    """
+    unique_pharmacies = {}
+    total_records = 0
 
     district_files = sorted(DATA_DIR.glob(DISTRICT_PATTERN))
 
     if not district_files:
         print(f"  ⚠ No district files found matching: {DISTRICT_PATTERN}")
-        return []
+        return unique_pharmacies, total_records
 
     print(f"  Found {len(district_files)} district files")
 
     for district_file in district_files:
         try:
-            with open(district_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                pharmacies = list(reader)
-                all_pharmacies.extend(pharmacies)
-                print(f"  ✓ Loaded {len(pharmacies):3d} pharmacies from {district_file.name}")
+            pharmacies = read_district_file(district_file)
+            merge_pharmacies(unique_pharmacies, pharmacies)
+            total_records += len(pharmacies)
+            print(f"  ✓ Loaded {len(pharmacies):3d} pharmacies from {district_file.name}")
         except Exception as e:
             print(f"  ✗ Failed to read {district_file.name}: {e}")
 
-    return all_pharmacies
+    return unique_pharmacies, total_records
 
 
-def deduplicate_pharmacies(pharmacies: List[Dict]) -> List[Dict]:
-    """Remove duplicate pharmacies by place_id."""
-    unique_pharmacies = {}
-
+def merge_pharmacies(unique_pharmacies: Dict[str, Dict], pharmacies: Iterable[Dict]) -> None:
+    """Merge pharmacies into unique_pharmacies by place_id, dropping rows without one."""
     for pharmacy in pharmacies:
         place_id = pharmacy.get('place_id')
         if place_id:
@@ -61,22 +99,21 @@ def deduplicate_pharmacies(pharmacies: List[Dict]) -> List[Dict]:
             elif len(pharmacy) > len(unique_pharmacies[place_id]):
                 unique_pharmacies[place_id] = pharmacy
 
-    duplicates_removed = len(pharmacies) - len(unique_pharmacies)
-    if duplicates_removed > 0:
-        print(f"  ℹ Removed {duplicates_removed} duplicate pharmacies")
 
-    return list(unique_pharmacies.values())
+def district_number(district_num) -> int:
+    """District number to sort by; missing or non-numeric districts sort last."""
+    return int(district_num) if str(district_num).isdigit() else 999
+
+
+def pharmacy_sort_key(pharmacy: Dict) -> Tuple[int, str]:
+    """Sort key: district number, then lowercased name."""
+    return district_number(pharmacy.get('district_num')), (pharmacy.get('name') or '').lower()
 
 
 def sort_pharmacies(pharmacies: List[Dict]) -> List[Dict]:
     """Sort pharmacies by district number, then alphabetically by name."""
-    return sorted(
-        pharmacies,
-        key=lambda x: (
-            int(x.get('district_num', 999)),
-            (x.get('name') or '').lower()
-        )
-    )
+    # sorted() computes each row's key once up front (decorate-sort-undecorate)
+    return sorted(pharmacies, key=pharmacy_sort_key)
 
 
 def write_consolidated_csv(pharmacies: List[Dict]) -> None:
@@ -92,21 +129,16 @@ def write_consolidated_csv(pharmacies: List[Dict]) -> None:
 
 def print_statistics(pharmacies: List[Dict]) -> None:
     """Print statistics by district."""
-    district_counts = {}
-
-    for pharmacy in pharmacies:
-        district_num = pharmacy.get('district_num', 'Unknown')
-        district_counts[district_num] = district_counts.get(district_num, 0) + 1
+    district_counts = Counter(pharmacy.get('district_num', 'Unknown') for pharmacy in pharmacies)
 
     print(f"\n  📊 Pharmacies by district:")
     print("  " + "-" * 40)
 
-    total = 0
-    for district_num in sorted(district_counts.keys(), key=lambda x: int(x) if str(x).isdigit() else 999):
+    for district_num in sorted(district_counts, key=district_number):
         count = district_counts[district_num]
-        total += count
         print(f"    District {district_num:>2s}: {count:3d} pharmacies")
 
+    total = sum(district_counts.values())
     print("  " + "-" * 40)
     print(f"    TOTAL: {total} pharmacies across {len(district_counts)} districts")
 
@@ -117,8 +149,8 @@ def print_statistics(pharmacies: List[Dict]) -> None:
 
     # Find districts with most/least pharmacies
     if district_counts:
-        max_district = max(district_counts.items(), key=lambda x: x[1])
-        min_district = min(district_counts.items(), key=lambda x: x[1])
+        max_district = district_counts.most_common(1)[0]
+        min_district = min(district_counts.items(), key=itemgetter(1))
         print(f"\n  Highest: District {max_district[0]} ({max_district[1]} pharmacies)")
         print(f"  Lowest: District {min_district[0]} ({min_district[1]} pharmacies)")
 
@@ -132,23 +164,26 @@ def main():
     # Create data directory if it doesn't exist
     DATA_DIR.mkdir(exist_ok=True)
 
-    # Load all district files
+    # Load all district files, merging duplicates as they are read so only
+    # one file's rows plus the unique pharmacies are held at a time
     print("\n[1/4] Loading district CSV files...")
-    all_pharmacies = load_district_files()
+    unique_pharmacies, total_records = load_district_files()
 
-    if not all_pharmacies:
+    if not total_records:
         print("\n✗ No pharmacy data found to consolidate")
         sys.exit(1)
 
-    print(f"\n  Loaded {len(all_pharmacies)} total pharmacy records")
+    print(f"\n  Loaded {total_records} total pharmacy records")
 
     # Deduplicate
     print("\n[2/4] Removing duplicates...")
-    unique_pharmacies = deduplicate_pharmacies(all_pharmacies)
+    duplicates_removed = total_records - len(unique_pharmacies)
+    if duplicates_removed > 0:
+        print(f"  ℹ Removed {duplicates_removed} duplicate pharmacies")
 
     # Sort
     print("\n[3/4] Sorting pharmacies...")
-    sorted_pharmacies = sort_pharmacies(unique_pharmacies)
+    sorted_pharmacies = sort_pharmacies(list(unique_pharmacies.values()))
 
     # Write consolidated file
     print("\n[4/4] Writing consolidated CSV...")
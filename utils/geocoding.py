@@ -0,0 +1,155 @@
+"""
+Google Geocoding API client with a persistent on-disk cache.
+
+Shared by the building scripts so every caller reuses one HTTP session,
+one SQLite cache (data/geocode_cache.sqlite) and one request rate limit.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import requests
+
+PROJECT_ROOT = Path(__file__).parent.parent
+GEOCODE_CACHE_DB = PROJECT_ROOT / "data" / "geocode_cache.sqlite"
+GEOCODE_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+# Minimum delay between two live API requests, across all threads
+MIN_REQUEST_INTERVAL = 0.1
+
+SESSION = requests.Session()
+
+_cache: Optional[sqlite3.Connection] = None
+# Successful lookups of this run, so repeats skip SQLite
+_memo: Dict[str, Dict] = {}
+_cache_lock = threading.Lock()
+_rate_lock = threading.Lock()
+_last_request = 0.0
+
+
+def get_api_key() -> Optional[str]:
+    """Return the Google API key from the environment, if any"""
+    return os.getenv('GOOGLE_MAPS_API_KEY') or os.getenv('GOOGLE_PLACES_API_KEY')
+
+
+def normalize_address(address: str) -> str:
+    """Normalize an address into a cache key (case and whitespace insensitive)"""
+    return ' '.join(address.lower().split())
+
+
+def get_cache() -> sqlite3.Connection:
+    """Open (once) the persistent address -> coordinates cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            GEOCODE_CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(GEOCODE_CACHE_DB, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geo("
+                "addr TEXT PRIMARY KEY, lat REAL, lng REAL, formatted_address TEXT)"
+            )
+            _cache = conn
+    return _cache
+
+
+def _cache_get(key: str) -> Optional[Dict]:
+    cache = get_cache()
+    with _cache_lock:
+        row = cache.execute(
+            "SELECT lat, lng, formatted_address FROM geo WHERE addr = ?", (key,)
+        ).fetchone()
+    if not row:
+        return None
+    return {'latitude': row[0], 'longitude': row[1], 'formatted_address': row[2] or ''}
+
+
+def _cache_put(key: str, result: Dict) -> None:
+    cache = get_cache()
+    with _cache_lock, cache:
+        cache.execute(
+            "INSERT OR REPLACE INTO geo(addr, lat, lng, formatted_address) VALUES (?, ?, ?, ?)",
+            (key, result['latitude'], result['longitude'], result['formatted_address'])
+        )
+
+
+def _throttle() -> None:
+    """Block until MIN_REQUEST_INTERVAL has passed since the last live request"""
+    global _last_request
+    with _rate_lock:
+        wait = _last_request + MIN_REQUEST_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request = time.monotonic()
+
+
+def geocode(address: str, api_key: Optional[str] = None) -> Optional[Dict]:
+    """
+    Geocode an address, serving repeat lookups from the on-disk cache
+
+    Failed lookups are not cached, so a later call retries them.
+
+    Args:
+        address: Full address string
+        api_key: Google API key (defaults to get_api_key()); without one
+            only cached addresses can be resolved
+
+    Returns:
+        Dictionary with latitude, longitude, formatted_address, or None
+    """
+    key = normalize_address(address)
+    if key in _memo:
+        return _memo[key]
+    cached = _cache_get(key)
+    if cached:
+        _memo[key] = cached
+        return cached
+
+    api_key = api_key or get_api_key()
+    if not api_key:
+        return None
+
+    try:
+        _throttle()
+        response = SESSION.get(GEOCODE_URL, params={'address': address, 'key': api_key}, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+
+        if data['status'] == 'OK' and data['results']:
+            first = data['results'][0]
+            location = first['geometry']['location']
+            result = {
+                'latitude': location['lat'],
+                'longitude': location['lng'],
+                'formatted_address': first.get('formatted_address', '')
+            }
+            _cache_put(key, result)
+            _memo[key] = result
+            return result
+
+        print(f"    ⚠️  Geocoding failed for {address}: {data.get('status', 'Unknown error')}")
+    except Exception as e:
+        print(f"    ❌ Geocoding error for {address}: {e}")
+
+    return None
+
+
+def geocode_many(addresses: Iterable[str], api_key: Optional[str] = None,
+                 max_workers: int = 10) -> Dict[str, Optional[Dict]]:
+    """
+    Geocode several addresses concurrently
+
+    Duplicate addresses are looked up once. Live requests still respect
+    MIN_REQUEST_INTERVAL, so concurrency mostly overlaps network latency.
+
+    Returns:
+        Mapping of each input address to its geocode() result
+    """
+    unique = list(dict.fromkeys(addresses))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda address: geocode(address, api_key), unique)
+        return dict(zip(unique, results))
@@ -0,0 +1,300 @@
+"""
+HERE Routing and Matrix API client with a persistent on-disk cache.
+
+Shared by the church route scripts (03_verify_routes_with_here.py and
+04_add_driving_info.py) so both use the same cache schema and keys: a leg
+or matrix routed by one is not requested again by the other.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Try to import pyarrow to also write routes as Parquet
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+EARTH_DIAMETER_KM = 2 * 6371  # 2R, for the Haversine formula
+
+# HERE API key
+HERE_API_KEY = os.environ.get('HERE_API_KEY', '0zt1IVbSQt3cPrM8_jaLXyFoq9TALX4OPXWfIsxGg1s')
+
+ROUTES_URL = "https://router.hereapi.com/v8/routes"
+
+# HERE Matrix API: one asynchronous request returns every origin/destination pair
+MATRIX_URL = "https://matrix.router.hereapi.com/v8/matrix"
+MATRIX_POLL_INTERVAL = 2  # seconds between status checks
+
+# Concurrent routing requests, and the request rate allowed across all of
+# them (HERE's per-second rate limit)
+ROUTE_WORKERS = 10
+REQUESTS_PER_SECOND = 10
+
+# One keep-alive connection pool shared by all routing threads, retrying
+# rate-limit and server errors with backoff (honouring Retry-After)
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=ROUTE_WORKERS,
+    pool_maxsize=ROUTE_WORKERS,
+    max_retries=Retry(total=5, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['GET', 'POST'])
+))
+
+# Persistent HERE response cache, relative to the project root the route
+# scripts run from
+HERE_CACHE_DB = 'data/churches/here_cache.sqlite'
+
+# Cached routes older than this are revalidated with HERE (a conditional
+# request, so an unchanged route comes back as a bodyless 304)
+ROUTE_CACHE_MAX_AGE_DAYS = 30
+
+_here_cache: Optional[sqlite3.Connection] = None
+_cache_lock = threading.Lock()
+_rate_lock = threading.Lock()
+_tokens = float(REQUESTS_PER_SECOND)
+_last_refill = time.monotonic()
+
+
+def _throttle() -> None:
+    """
+    Take one token from the REQUESTS_PER_SECOND token bucket, blocking until
+    one is available; up to a second's worth of requests can go out at once
+    """
+    global _tokens, _last_refill
+    with _rate_lock:
+        now = time.monotonic()
+        _tokens = min(REQUESTS_PER_SECOND, _tokens + (now - _last_refill) * REQUESTS_PER_SECOND)
+        _last_refill = now
+        if _tokens < 1:
+            time.sleep((1 - _tokens) / REQUESTS_PER_SECOND)
+            _last_refill = time.monotonic()
+            _tokens = 1.0
+        _tokens -= 1
+
+
+def open_here_cache() -> sqlite3.Connection:
+    """Open (once) the persistent HERE response cache"""
+    global _here_cache
+    with _cache_lock:
+        if _here_cache is None:
+            os.makedirs(os.path.dirname(HERE_CACHE_DB), exist_ok=True)
+            conn = sqlite3.connect(HERE_CACHE_DB, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS here(key TEXT PRIMARY KEY, value TEXT)")
+            _here_cache = conn
+    return _here_cache
+
+
+def cache_get(key: str) -> Optional[Dict]:
+    """Return the cached HERE response stored under key, if any"""
+    cache = open_here_cache()
+    with _cache_lock:
+        row = cache.execute("SELECT value FROM here WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def cache_set(key: str, value: Dict) -> None:
+    """Store a HERE response under key, committing it right away"""
+    cache = open_here_cache()
+    with _cache_lock, cache:
+        cache.execute("INSERT OR REPLACE INTO here VALUES (?, ?)", (key, json.dumps(value)))
+
+
+def point_key(lat: float, lng: float) -> str:
+    """Coordinates rounded to 5 decimals (about 1 m), so GPS jitter keeps the same cache keys"""
+    return f"{lat:.5f},{lng:.5f}"
+
+
+def route_cache_key(origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float) -> str:
+    """Cache key of the driving route between two points"""
+    leg = f"{point_key(origin_lat, origin_lng)}>{point_key(dest_lat, dest_lng)}"
+    return 'route:' + hashlib.blake2b(leg.encode(), digest_size=16).hexdigest()
+
+
+def matrix_cache_key(lat: np.ndarray, lng: np.ndarray) -> Tuple[str, List[int], np.ndarray]:
+    """
+    Cache key of the route matrix between a set of points
+
+    Matrices are stored in sorted-coordinate order under a hash of the
+    sorted points, so a reordered route reuses them.
+
+    Returns:
+        (cache key, point indices in sorted order, each point's rank in that order)
+    """
+    n = len(lat)
+    points = [point_key(a, b) for a, b in zip(lat.tolist(), lng.tolist())]
+    order = sorted(range(n), key=points.__getitem__)
+    rank = np.empty(n, dtype=int)
+    rank[order] = np.arange(n)
+    key = 'matrix:' + hashlib.blake2b('|'.join(points[i] for i in order).encode(), digest_size=16).hexdigest()
+    return key, order, rank
+
+
+def haversine_vec(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """
+    Haversine distance in km, element-wise over (broadcastable) NumPy arrays
+    Uses 2R*asin(sqrt(a)): one inverse trig call and no sqrt(1-a)
+    """
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    dlat_half = (lat2 - lat1) * 0.5
+    dlng_half = (lng2 - lng1) * 0.5
+
+    a = np.sin(dlat_half)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng_half)**2
+    return EARTH_DIAMETER_KM * np.arcsin(np.sqrt(a))
+
+
+def leg_info(length_meters: float, duration_seconds: float) -> Dict:
+    """Driving info of one leg in every unit the route CSVs use"""
+    return {
+        'distance_meters': length_meters,
+        'distance_km': length_meters / 1000,
+        'distance_miles': (length_meters / 1000) * 0.621371,
+        'duration_seconds': duration_seconds,
+        'duration_minutes': duration_seconds / 60,
+        'duration_hours': duration_seconds / 3600
+    }
+
+
+def get_driving_route(origin_lat: float, origin_lng: float,
+                      dest_lat: float, dest_lng: float) -> Optional[Dict]:
+    """
+    Get driving route between two points using HERE Routing API
+    Returns leg_info() of the route, served from the HERE cache when this
+    leg was routed in the last ROUTE_CACHE_MAX_AGE_DAYS
+    """
+    key = route_cache_key(origin_lat, origin_lng, dest_lat, dest_lng)
+    summary = cache_get(key)
+
+    if summary is None or time.time() - summary.get('fetched_at', 0) > ROUTE_CACHE_MAX_AGE_DAYS * 86400:
+        cached = summary
+        try:
+            params = {
+                'apiKey': HERE_API_KEY,
+                'transportMode': 'car',
+                'origin': f'{origin_lat},{origin_lng}',
+                'destination': f'{dest_lat},{dest_lng}',
+                'return': 'summary'
+            }
+
+            # Revalidate a stale entry with the validators HERE sent for it
+            headers = {}
+            if cached and cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached and cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+            _throttle()
+            response = SESSION.get(ROUTES_URL, params=params, headers=headers, timeout=15)
+            response.raise_for_status()
+
+            if response.status_code == 304 and cached:
+                summary = cached
+            else:
+                data = response.json()
+
+                if 'routes' in data and len(data['routes']) > 0:
+                    summary = dict(data['routes'][0]['sections'][0]['summary'])
+                    summary['etag'] = response.headers.get('ETag')
+                    summary['last_modified'] = response.headers.get('Last-Modified')
+                else:
+                    print(f"  Warning: No route found")
+                    return None
+
+            summary['fetched_at'] = time.time()
+            cache_set(key, summary)
+
+        except Exception as e:
+            print(f"  Error getting route: {e}")
+            # A stale route beats none
+            if cached is None:
+                return None
+            summary = cached
+
+    return leg_info(summary['length'], summary['duration'])
+
+
+def get_driving_routes(origin_lat: np.ndarray, origin_lng: np.ndarray,
+                       dest_lat: np.ndarray, dest_lng: np.ndarray) -> List[Optional[Dict]]:
+    """Get driving routes for each origin/destination coordinate pair concurrently, in order"""
+    with ThreadPoolExecutor(max_workers=ROUTE_WORKERS) as executor:
+        return list(executor.map(
+            get_driving_route, origin_lat.tolist(), origin_lng.tolist(), dest_lat.tolist(), dest_lng.tolist()
+        ))
+
+
+def get_route_matrix(lat: np.ndarray, lng: np.ndarray) -> Optional[Dict]:
+    """
+    Get the full driving matrix between points using HERE Matrix API
+    Submits one asynchronous calculation and polls it until it finishes
+
+    Returns:
+        Dictionary with flat, origin-major 'distances' (meters), 'travelTimes'
+        (seconds) and optional 'errorCodes' lists, or None on failure
+    """
+    points = [{'lat': a, 'lng': b} for a, b in zip(lat.tolist(), lng.tolist())]
+    body = {
+        'origins': points,
+        'destinations': points,
+        # 'world' is flexible mode, capped at 15 origins; autoCircle fits a
+        # region around the points and takes the largest circles in one call
+        'regionDefinition': {'type': 'autoCircle'},
+        'matrixAttributes': ['distances', 'travelTimes'],
+        'transportMode': 'car'
+    }
+
+    try:
+        response = SESSION.post(
+            MATRIX_URL, params={'apiKey': HERE_API_KEY, 'async': 'true'}, json=body, timeout=30
+        )
+        response.raise_for_status()
+        status = response.json()
+
+        # The status endpoint answers with a redirect once the matrix is ready
+        while status.get('status') in ('accepted', 'inProgress'):
+            time.sleep(MATRIX_POLL_INTERVAL)
+            response = SESSION.get(
+                status['statusUrl'], params={'apiKey': HERE_API_KEY}, timeout=30, allow_redirects=False
+            )
+            response.raise_for_status()
+            status = response.json()
+
+        if status.get('status') != 'completed':
+            print(f"  Error: Matrix calculation {status.get('status')}: {status.get('error', status)}")
+            return None
+
+        response = SESSION.get(status['resultUrl'], params={'apiKey': HERE_API_KEY}, timeout=60)
+        response.raise_for_status()
+
+        return response.json()['matrix']
+
+    except Exception as e:
+        print(f"  Error getting route matrix: {e}")
+        return None
+
+
+def write_route(df: pd.DataFrame, output_csv: str) -> None:
+    """
+    Write a route CSV, plus a typed Parquet copy next to it when pyarrow is
+    installed so later steps can load it without re-parsing text
+    """
+    df.to_csv(output_csv, index=False)
+    if PYARROW_AVAILABLE:
+        try:
+            df.to_parquet(output_csv[:-len('.csv')] + '.parquet', engine='pyarrow',
+                          compression='zstd', index=False)
+        except pa.ArrowException as e:
+            print(f"   Warning: Could not write Parquet copy: {e}")
@@ -0,0 +1,174 @@
+"""
+Serper search client; Google Maps searches have a persistent on-disk cache.
+
+Shared by the CT facility scripts so every caller reuses one keep-alive
+HTTP session, one SQLite cache (data/serper_cache.sqlite) and one request
+rate limit, however many threads search at once.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SERPER_CACHE_DB = PROJECT_ROOT / "data" / "serper_cache.sqlite"
+MAPS_URL = 'https://google.serper.dev/maps'
+SEARCH_URL = 'https://google.serper.dev/search'
+
+# Cached search results older than this are searched again
+CACHE_MAX_AGE_HOURS = 24
+
+# Concurrent searches callers should run, and the request rate allowed
+# across all of them
+SEARCH_WORKERS = 16
+REQUESTS_PER_SECOND = 5
+
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=SEARCH_WORKERS, pool_maxsize=SEARCH_WORKERS))
+
+_cache: Optional[sqlite3.Connection] = None
+# Successful searches of this run, so repeats skip SQLite and JSON decoding
+_memo: Dict[str, List[Dict]] = {}
+_cache_lock = threading.Lock()
+_rate_lock = threading.Lock()
+_tokens = float(REQUESTS_PER_SECOND)
+_last_refill = time.monotonic()
+
+
+def get_api_key() -> Optional[str]:
+    """Return the Serper API key from the environment, if any"""
+    return os.getenv('SERPER_API_KEY')
+
+
+def cache_key(query: str, location: str) -> str:
+    """Hash a (query, location) search into a fixed-size cache key"""
+    return hashlib.blake2b(json.dumps([query, location]).encode(), digest_size=16).hexdigest()
+
+
+def get_cache() -> sqlite3.Connection:
+    """Open (once) the persistent search -> places cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            SERPER_CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(SERPER_CACHE_DB, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS maps(key TEXT PRIMARY KEY, fetched_at REAL, places TEXT)"
+            )
+            _cache = conn
+    return _cache
+
+
+def _cache_get(key: str) -> Optional[List[Dict]]:
+    cache = get_cache()
+    with _cache_lock:
+        row = cache.execute("SELECT fetched_at, places FROM maps WHERE key = ?", (key,)).fetchone()
+    if not row or time.time() - row[0] > CACHE_MAX_AGE_HOURS * 3600:
+        return None
+    return json.loads(row[1])
+
+
+def _cache_put(key: str, places: List[Dict]) -> None:
+    cache = get_cache()
+    with _cache_lock, cache:
+        cache.execute(
+            "INSERT OR REPLACE INTO maps(key, fetched_at, places) VALUES (?, ?, ?)",
+            (key, time.time(), json.dumps(places))
+        )
+
+
+def _throttle() -> None:
+    """
+    Take one token from the REQUESTS_PER_SECOND token bucket, blocking until
+    one is available; up to a second's worth of requests can go out at once
+    """
+    global _tokens, _last_refill
+    with _rate_lock:
+        now = time.monotonic()
+        _tokens = min(REQUESTS_PER_SECOND, _tokens + (now - _last_refill) * REQUESTS_PER_SECOND)
+        _last_refill = now
+        if _tokens < 1:
+            time.sleep((1 - _tokens) / REQUESTS_PER_SECOND)
+            _last_refill = time.monotonic()
+            _tokens = 1.0
+        _tokens -= 1
+
+
+def _post(url: str, query: str, location: str) -> Dict:
+    """Send one rate-limited Serper search and return the decoded response"""
+    payload = {
+        "q": query,
+        "location": location,
+        "gl": "us",
+        "hl": "en"
+    }
+    headers = {
+        "X-API-KEY": get_api_key(),
+        "Content-Type": "application/json"
+    }
+
+    _throttle()
+    response = SESSION.post(url, json=payload, headers=headers, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def search_maps(query: str, location: str = "Connecticut") -> List[Dict]:
+    """
+    Search Serper's Google Maps endpoint, serving repeat searches (from this
+    run or, for CACHE_MAX_AGE_HOURS, from earlier runs and other scripts)
+    from the on-disk cache
+
+    Safe to call from several threads; live requests share the session and
+    the rate limit. Failed requests are not cached, so a later call retries.
+
+    Returns:
+        The 'places' results (addresses, coordinates, hours, ...), or an
+        empty list on error. Repeat searches return the same list object, so
+        callers must not mutate it.
+    """
+    key = cache_key(query, location)
+    if key in _memo:
+        return _memo[key]
+    cached = _cache_get(key)
+    if cached is not None:
+        _memo[key] = cached
+        return cached
+
+    try:
+        data = _post(MAPS_URL, query, location)
+
+        # Google Maps API returns 'places' array
+        places = data.get("places", [])
+        _cache_put(key, places)
+        _memo[key] = places
+        return places
+    except Exception as e:
+        print(f"   ⚠️  Serper Maps API error: {e}")
+        return []
+
+
+def search_organic(query: str, location: str = "Connecticut") -> List[Dict]:
+    """
+    Search Serper's Google web search endpoint (not cached)
+
+    Safe to call from several threads; requests share the session and the
+    rate limit with search_maps.
+
+    Returns:
+        The 'organic' results (title, link, snippet, ...), or an empty list
+        on error
+    """
+    try:
+        return _post(SEARCH_URL, query, location).get("organic", [])
+    except Exception as e:
+        print(f"   ⚠️  Serper Search API error: {e}")
+        return []